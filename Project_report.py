@@ -3,31 +3,39 @@ import argparse
 import logging
 import re
 import os
+import time
+import threading
 from datetime import datetime, date
+from functools import lru_cache
 from collections import defaultdict
-import tempfile
-from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import json  # ensure you import this at top if not yet present!
 
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
 
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from hb_attachments import Attachment, AttachmentTexts, AttachmentTooLarge, extract_text, read_capped
+from hb_cache import CACHE_MODE, mount_cache
+from hb_docx import FragmentMerger, FragmentTemplate, StreamingDocxWriter, run_content_xml, take_body_fragment
+from hb_html import html_text_and_tables, html_to_text
+from hb_media import scaled_image
+from hb_pages import iter_records
+from hb_sync import SnapshotStore, sync_collection
+
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.section import WD_ORIENT, WD_SECTION
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsdecls, qn
 from docx.enum.table import WD_ROW_HEIGHT_RULE
+from docx.table import Table
 from docx.shared import RGBColor, Pt, Inches, Mm
 
-
-from pdf2docx import Converter
-
 # ─── Logger Setup ───────────────────────────────────────────
 def ensure_str(val):
     return ", ".join(val) if isinstance(val, (list, tuple)) else str(val or "N/A")
@@ -43,39 +51,111 @@ HEADERS   = {
     "Content-Type": "application/vnd.api+json"
 }
 
+# Issue fetches run concurrently; the connection pool is sized to match
+ISSUE_FETCH_WORKERS = int(os.getenv("HIGHBOND_ISSUE_WORKERS", "8"))
+# Issue tables: "template" fills a precompiled XML fragment, "object" builds them via python-docx
+ISSUE_TABLE_MODE = os.getenv("HIGHBOND_TABLE_MODE", "template")
+# Project footers: "sections" (a section and header/footer pair per project) or "styleref" (one shared footer)
+PROJECT_FOOTER_MODE = os.getenv("HIGHBOND_FOOTER_MODE", "sections")
+# Project bodies render in this many processes (1 = in the main process)
+RENDER_WORKERS = int(os.getenv("HIGHBOND_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Large regional reports can be streamed to disk project by project (hb_docx.py)
+REPORT_STREAM = os.getenv("HIGHBOND_REPORT_STREAM", "").lower() in ("1", "true", "yes")
+
 session = requests.Session()
-retries = Retry(total=5, backoff_factor=1, status_forcelist=[429,500,502,503,504], allowed_methods=["GET"])
-adapter = HTTPAdapter(max_retries=retries)
-session.mount("https://", adapter)
-session.mount("http://", adapter)
 
-def convert_pdf_to_docx(pdf_path: str, docx_path: str):
-    try:
-        cv = Converter(pdf_path)
-        cv.convert(docx_path, start=0, end=None)
-        cv.close()
-        logger.info(f"✅ PDF converted to DOCX: {docx_path}")
-    except Exception as e:
-        logger.error(f"❌ Error in PDF→DOCX conversion: {e}")
+def mount_adapter(pool_size=ISSUE_FETCH_WORKERS, cache_mode=CACHE_MODE):
+    """
+    (Re)mount the retrying, caching adapter with room for `pool_size` connections.
+    cache_mode: "on" (default), "offline" (cache only, no network) or "off".
+    Requests draw from the shared adaptive rate limiter (hb_ratelimit.py), which
+    also handles 429/503 + Retry-After, so urllib3 only retries the other 5xx.
+    """
+    retries = Retry(total=5, backoff_factor=1, status_forcelist=[500,502,504], allowed_methods=["GET"])
+    return mount_cache(session, mode=cache_mode, max_retries=retries,
+                       pool_connections=pool_size, pool_maxsize=pool_size)
+
+adapter = mount_adapter()
+sync_store = SnapshotStore()
+
+def session_get(url, params=None, timeout=10, **kwargs):
+    """GET through the shared session (cache, rate limiter and retries included)."""
+    return session.get(url, headers=HEADERS, params=params, timeout=timeout, **kwargs)
 
 # ─── Data Fetching ──────────────────────────────────────────
-def get_all_projects():
+# Sparse fieldsets: only the attributes main() actually reads
+PROJECT_FIELDS = ("name", "start_date", "status", "custom_attributes", "updated_at")
+ISSUE_FIELDS = ("title", "severity", "description", "effect", "cost_impact", "recommendation", "custom_attributes")
+# Opt-in: fill comments still missing from find_management_comments(), which downloads
+# issue attachments; the "attachments" relationship is then requested as well
+ATTACHMENT_COMMENTS = os.getenv("HIGHBOND_ATTACHMENT_COMMENTS", "").lower() in ("1", "true", "yes")
+
+def month_bounds(month):
+    """Return (first_day, last_day) ISO strings for a YYYY-MM month."""
+    first = datetime.strptime(month, "%Y-%m").date()
+    nxt = date(first.year + (first.month == 12), first.month % 12 + 1, 1)
+    return first.isoformat(), date.fromordinal(nxt.toordinal() - 1).isoformat()
+
+def project_query_params(month=None):
+    """
+    Build the /projects query: start-date window pushed to the API plus the
+    sparse fieldset. Region lives in a custom attribute, which the projects
+    endpoint can't filter on, so main() still checks it client-side.
+    """
     today_str = date.today().isoformat()
+    params = {
+        "filter[start_date][lte]": today_str,
+        "fields[projects]": ",".join(PROJECT_FIELDS),
+        "page[size]": 100,
+        "page[number]": 1,
+    }
+    if month:
+        first, last = month_bounds(month)
+        params["filter[start_date][gte]"] = first
+        params["filter[start_date][lte]"] = min(last, today_str)
+    return params
+
+def issue_query_params(severities=None, fields=ISSUE_FIELDS):
+    """Build the /projects/{id}/issues query: severity filter plus sparse fieldset."""
+    params = {"fields[issues]": ",".join(fields), "page[size]": 100}
+    if severities:
+        params["filter[severity]"] = ",".join(sorted(s.capitalize() for s in severities))
+    return params
+
+def _sync_projects(params, month=None, full_sync=False):
+    """
+    Incremental variant: merge projects updated since the last run into the
+    local snapshot (see hb_sync.py) and return the whole snapshot.
+    The start_date <= today bound is left to the caller, since a project
+    that was future-dated at the last sync won't show up as "updated".
+    """
+    params = {k: v for k, v in params.items() if k != "filter[start_date][lte]" or month}
+    if month:
+        params["filter[start_date][lte]"] = month_bounds(month)[1]
+    name = f"projects_{month or 'all'}"
+    try:
+        return sync_collection(
+            sync_store, name,
+            lambda extra: list(iter_paginated(f"{BASE_URL}/projects", params={**params, **extra})),
+            full=full_sync,
+        )
+    except Exception as e:
+        logger.error(f"Incremental project sync failed, using last snapshot: {e}")
+        return list(sync_store.load(name)["records"].values())
+
+def get_all_projects(month=None, incremental=False, full_sync=False):
     url = f"{BASE_URL}/projects"
-    params = {"filter[start_date][lte]": today_str, "page[size]": 100, "page[number]": 1}
+    params = project_query_params(month)
     all_projects = []
-    while url:
+    if incremental:
+        all_projects = _sync_projects(params, month, full_sync)
+    else:
         try:
-            resp = session.get(url, headers=HEADERS, params=params, timeout=10)
-            resp.raise_for_status()
+            # a failed page keeps the projects already read
+            for project in iter_paginated(url, params=params):
+                all_projects.append(project)
         except Exception as e:
             logger.error(f"Failed to fetch projects: {e}")
-            break
-        js = resp.json()
-        all_projects.extend(js.get("data", []))
-        next_link = js.get("links", {}).get("next")
-        url = urljoin(BASE_URL, next_link) if next_link else None
-        params = None
     # final date filter
     valid = []
     for p in all_projects:
@@ -88,39 +168,37 @@ def get_all_projects():
     logger.info(f"📦 Retrieved {len(valid)} valid projects")
     return valid
 
-def get_project_issues(pid):
+def iter_paginated(url, params=None, timeout=10):
+    """Yield `data` records from every page of a collection through the shared session (hb_pages)."""
+    return iter_records(session, url, params=params, headers=HEADERS, base_url=BASE_URL, timeout=timeout)
+
+def get_project_issues(pid, params=None):
+    params = dict(params) if params else issue_query_params()
     try:
-        resp = session.get(f"{BASE_URL}/projects/{pid}/issues", headers=HEADERS, timeout=10)
-        resp.raise_for_status()
+        return list(iter_paginated(f"{BASE_URL}/projects/{pid}/issues", params=params))
     except Exception as e:
         logger.error(f"Failed to fetch issues for project {pid}: {e}")
         return []
-    return resp.json().get("data", [])
+
+def get_issues_for_projects(pids, max_workers=ISSUE_FETCH_WORKERS, params=None):
+    """
+    Fetch issues for many projects with at most `max_workers` requests in flight.
+    Returns one issue list per project, in the same order as `pids`.
+    """
+    pids = list(pids)
+    if not pids:
+        return []
+    workers = max(1, min(max_workers, len(pids)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda pid: get_project_issues(pid, params), pids))
 
 def clean_html_and_extract_tables(value):
     if not isinstance(value, str):
         return ensure_str(value), []
 
-    soup = BeautifulSoup(value, "html.parser")
-    for tag in soup(["script", "style"]): tag.decompose()
-    for br in soup.find_all("br"): br.replace_with("\n")
-    for p in soup.find_all("p"): p.insert_after("\n")
-
-    tables = []
-    for tbl in soup.find_all("table"):
-        headers = [th.get_text(strip=True) for th in tbl.find_all("th")]
-        rows = [
-            [td.get_text(strip=True) for td in tr.find_all("td")]
-            for tr in tbl.find_all("tr")
-            if any(td.get_text(strip=True) for td in tr.find_all("td"))
-        ]
-        tables.append((headers, rows))
-        tbl.decompose()
-
-    text = soup.get_text(separator="\n").strip()
-    text = text.replace("$", "")
+    # script/style dropped, <br> and </p> as newlines, tables pulled out; see hb_html.py
+    text, tables = html_text_and_tables(value)
     #text = re.sub(r"[•–-]\s*", "", text)  # Remove bullets if needed
-    text = re.sub(r"\n+", "\n", text)     # Normalize newlines
 
     return text or "N/A", tables
 
@@ -166,7 +244,7 @@ def deep_find_comments(data):
                 if isinstance(v, (dict, list)):
                     walk(v)
                 elif isinstance(v, str):
-                    text = BeautifulSoup(v, "html.parser").get_text(separator="\n").strip()
+                    text = html_to_text(v)
                     if not cm1:
                         m = pat1.search(text)
                         if m:
@@ -186,13 +264,29 @@ def deep_find_comments(data):
 def _compute_column_widths(text_matrix, max_total_width_inches=10.0, min_width_inches=0.5):
     if not text_matrix:
         return []
-    cols = list(zip(*text_matrix))
+    return list(_column_plan(tuple(map(tuple, text_matrix)), max_total_width_inches, min_width_inches))
+
+@lru_cache(maxsize=1024)
+def _column_plan(matrix, max_total_width_inches, min_width_inches):
+    """
+    Column widths for a text matrix, memoized by its content (pasted tables
+    repeat across issues and reports). One pass over the cells collects each
+    column's longest text, whether any cell reads like a sentence (> 5 words)
+    and whether every non-empty cell is a number.
+    """
+    ncols = len(matrix[0])
+    longest, sentence, numeric = [0] * ncols, [False] * ncols, [True] * ncols
+    for row in matrix:
+        for j, c in enumerate(row):
+            s = str(c)
+            if len(s) > longest[j]:
+                longest[j] = len(s)
+            if not sentence[j] and len(s.split()) > 5:
+                sentence[j] = True
+            if numeric[j] and c and not s.replace(".", "", 1).isdigit():
+                numeric[j] = False
     scores, total = [], 0.0
-    for col in cols:
-        lengths = [len(str(c)) for c in col]
-        mx = max(lengths)
-        has_sent = any(len(str(c).split()) > 5 for c in col)
-        is_num = all(str(c).replace(".", "", 1).isdigit() for c in col if c)
+    for mx, has_sent, is_num in zip(longest, sentence, numeric):
         weight = 1.5 if has_sent else 0.5 if is_num else 1.0
         scores.append(mx * weight)
         total += mx * weight
@@ -203,10 +297,16 @@ def _compute_column_widths(text_matrix, max_total_width_inches=10.0, min_width_i
     if used > max_total_width_inches:
         factor = max_total_width_inches / used
         widths = [w * factor for w in widths]
-    return [Inches(w) for w in widths]
+    return tuple(Inches(w) for w in widths)
 
 
 # ─── Mini-Table Insertion ────────────────────────────────────
+# a header cell (bold, no spacing) and a body cell (no spacing, 1.15 lines), as python-docx writes them
+_MINI_HEADER_TC = ('<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="%d"/></w:tcPr><w:p><w:pPr>'
+                   '<w:spacing w:before="0" w:after="0"/></w:pPr><w:r><w:rPr><w:b/></w:rPr>%s</w:r></w:p></w:tc>')
+_MINI_BODY_TC = ('<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="%d"/></w:tcPr><w:p><w:pPr>'
+                 '<w:spacing w:before="0" w:after="0" w:line="276" w:lineRule="auto"/></w:pPr><w:r>%s</w:r></w:p></w:tc>')
+
 def add_mini_table_to_cell(cell, headers, rows):
     # flatten into a matrix
     col_count = max([len(headers)] + [len(r) for r in rows] + [0])
@@ -220,28 +320,20 @@ def add_mini_table_to_cell(cell, headers, rows):
     max_w = getattr(cell, "width", Inches(5)).inches
     col_w = _compute_column_widths(matrix, max_total_width_inches=max_w)
 
-    # Create the mini table
-    mini = cell.add_table(rows=1 if headers else 0, cols=col_count)
+    # Create the mini table: widths go on the grid once, the rows are built as XML and parsed in one go
+    mini = cell.add_table(rows=0, cols=col_count)
     mini.autofit = False
     mini.style = "Light Grid Accent 1"
+    for gridCol, width in zip(mini._tbl.tblGrid.gridCol_lst, col_w):
+        gridCol.w = width
 
-    if headers:
-        hdr_row = mini.rows[0].cells
-        for idx, txt in enumerate(matrix[0]):
-            hdr_row[idx].width = col_w[idx]
-            p = hdr_row[idx].paragraphs[0]
-            run = p.add_run(txt)
-            run.bold = True
-            p.paragraph_format.space_before = p.paragraph_format.space_after = Pt(0)
-
-    for row_vals in matrix[1 if headers else 0:]:
-        row_cells = mini.add_row().cells
-        for idx, txt in enumerate(row_vals):
-            row_cells[idx].width = col_w[idx]
-            p = row_cells[idx].paragraphs[0]
-            p.text = txt
-            p.paragraph_format.space_before = p.paragraph_format.space_after = Pt(0)
-            p.paragraph_format.line_spacing = 1.15
+    twips = [w.twips for w in col_w]
+    trs = []
+    for i, row_vals in enumerate(matrix):
+        tc = _MINI_HEADER_TC if headers and i == 0 else _MINI_BODY_TC
+        trs.append("<w:tr>" + "".join(tc % (tw, run_content_xml(txt)) for tw, txt in zip(twips, row_vals)) + "</w:tr>")
+    if trs:
+        mini._tbl.extend(parse_xml(f"<w:tbl {nsdecls('w')}>{''.join(trs)}</w:tbl>"))
 
     return mini  # ✅ Always return the created mini-table
 
@@ -314,7 +406,11 @@ def add_footer_page_number(section):
 
     p.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-def create_word_report(table_data, region_filters, severity_list):
+def _report_skeleton(table_data, region_filters):
+    """
+    Document with page setup, styles, cover page and the first content section.
+    Returns (doc, content_section, running header text).
+    """
     doc = Document()
 
     # ── Page setup ──
@@ -364,7 +460,7 @@ def create_word_report(table_data, region_filters, severity_list):
     try:
         para_l = cover_table.cell(0, 0).paragraphs[0]
         para_l.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        para_l.add_run().add_picture("images.png", width=Inches(1.4))
+        para_l.add_run().add_picture(scaled_image("images.png", width=Inches(1.4)), width=Inches(1.4))
     except Exception as e:
         print(f"⚠️ Left logo: {e}")
 
@@ -374,7 +470,7 @@ def create_word_report(table_data, region_filters, severity_list):
     try:
         para_r = cover_table.cell(0, 2).paragraphs[0]
         para_r.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-        para_r.add_run().add_picture("minigroup_logo.png", width=Inches(1.4))
+        para_r.add_run().add_picture(scaled_image("minigroup_logo.png", width=Inches(1.4)), width=Inches(1.4))
     except Exception as e:
         print(f"⚠️ Right logo: {e}")
 
@@ -424,130 +520,298 @@ def create_word_report(table_data, region_filters, severity_list):
 
     add_footer_page_number(content_section)
 
+    return doc, content_section, f"{month_str} {regions_display} Region Issues Report"
+
+def _add_project_section(doc, running_header):
+    """New page section for the next project, with its own header and page-number footer."""
+    doc.add_section(WD_SECTION.NEW_PAGE)
+    content_section = doc.sections[-1]
+    content_section.header.is_linked_to_previous = False
+    content_section.footer.is_linked_to_previous = False
+
+    header_p = content_section.header.add_paragraph(running_header)
+    header_p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    header_p.runs[0].italic = True
+
+    add_footer_page_number(content_section)
+    return content_section
+
+PROJECT_FOOTER_STYLE = "Project Footer"
+
+def _use_shared_footer(doc, content_section, first_line):
+    """
+    One footer for every project: a STYLEREF field showing the nearest hidden
+    "Project Footer" paragraph, which each project writes under its heading.
+    Word fills the field per page; `first_line` is the cached result other
+    viewers show until fields are updated.
+    """
+    style = doc.styles.add_style(PROJECT_FOOTER_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = doc.styles["Normal"]
+    style.font.hidden = True
+    style.font.size = Pt(9)
+    style.paragraph_format.space_before = style.paragraph_format.space_after = Pt(0)
+
+    footer = content_section.footer
+    for p in list(footer.paragraphs):
+        footer._element.remove(p._element)
+    p = footer.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    for kind, text in [("begin", None), ("instr", f' STYLEREF "{PROJECT_FOOTER_STYLE}" '), ("separate", None),
+                       ("text", first_line), ("end", None)]:
+        run = p.add_run(text if kind == "text" else None)
+        run.font.size = Pt(9)
+        run.font.color.rgb = RGBColor(0, 51, 102)
+        if kind == "instr":
+            instrText = OxmlElement('w:instrText')
+            instrText.set(qn('xml:space'), 'preserve')
+            instrText.text = text
+            run._r.append(instrText)
+        elif kind != "text":
+            fldChar = OxmlElement('w:fldChar')
+            fldChar.set(qn('w:fldCharType'), kind)
+            run._r.append(fldChar)
+
+def _project_footer_line(proj):
+    auditor = proj[17] if len(proj) > 17 else "N/A"
+    return f"Branch: {proj[2]} | Region: {proj[3]} | Start: {proj[4]} | BM: {proj[14]} | OM: {proj[15]} | Sup: {proj[16]} | Auditors: {auditor}"
+
+def create_word_report(table_data, region_filters, severity_list, stream_to=None, render_workers=RENDER_WORKERS):
+    """
+    Build the regional report. Returns the Document, or with `stream_to` writes
+    the .docx straight to that path project by project (flat memory, see
+    hb_docx.StreamingDocxWriter) and returns the path.
+
+    With `render_workers` > 1 project bodies are rendered in that many
+    processes and merged in order (hb_docx.FragmentMerger).
+
+    PROJECT_FOOTER_MODE "sections" gives each project its own section with its
+    own header/footer parts; "styleref" keeps one section and one footer part
+    for all projects (see _use_shared_footer).
+    """
+    doc, content_section, running_header = _report_skeleton(table_data, region_filters)
+
     # ── Group by Project ID ──
     grouped = defaultdict(list)
     for row in table_data:
         grouped[row[0]].append(row)
 
-    first = True
-    for pid, rows in grouped.items():
-        if not first:
-            doc.add_section(WD_SECTION.NEW_PAGE)
-            content_section = doc.sections[-1]
-            content_section.header.is_linked_to_previous = False
-            content_section.footer.is_linked_to_previous = False
-
-            header_p = content_section.header.add_paragraph(f"{month_str} {regions_display} Region Issues Report")
-            header_p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-            header_p.runs[0].italic = True
-
-            add_footer_page_number(content_section)
-
-        proj = rows[0]
-        auditor = proj[17] if len(proj) > 17 else "N/A"
-        name, branch, region, start, status = proj[1], proj[2], proj[3], proj[4], proj[5]
-        bm, om, sup = proj[14], proj[15], proj[16]
-
-        doc.add_heading(f"Project: {name}", level=1)
-        for label, value in [
-            ("Branch", branch),
-            ("Branch Manager", bm),
-            ("Auditor(s)", auditor)
-        ]:
-            para = doc.add_paragraph()
-            para.add_run(f"{label}: ").bold = True
-            para.add_run(str(value or "N/A"))
+    shared_footer = PROJECT_FOOTER_MODE == "styleref"
+    if shared_footer and grouped:
+        _use_shared_footer(doc, content_section, _project_footer_line(next(iter(grouped.values()))[0]))
+
+    projects = list(grouped.values())
+    bodies = _project_bodies(doc, projects, shared_footer, render_workers)
+
+    if stream_to:
+        # the first content section stays in `doc` as a scratch area: each project is
+        # rendered into it, written out and detached; its header/footer are copied per project
+        with StreamingDocxWriter(doc, stream_to) as writer:
+            for rows in bodies:
+                if shared_footer:
+                    writer.flush()
+                else:
+                    _set_project_footer(content_section, rows)
+                    writer.end_section(content_section)
+        return stream_to
+
+    for i, rows in enumerate(bodies):
+        if not shared_footer:
+            _set_project_footer(content_section, rows)
+            if i + 1 < len(projects):
+                content_section = _add_project_section(doc, running_header)
 
-        doc.add_paragraph()
+    return doc
 
-        footer = content_section.footer
-        for p in list(footer.paragraphs):
-            footer._element.remove(p._element)
+def _add_project(doc, rows, shared_footer=False, new_page=False, table_mode=None):
+    """
+    Project heading, details and one table per issue. With `shared_footer` the
+    footer line goes into a hidden marker paragraph for the STYLEREF footer
+    (see _use_shared_footer), and `new_page` starts the project on a fresh
+    page; otherwise the caller sets it with _set_project_footer. `table_mode`
+    defaults to ISSUE_TABLE_MODE.
+    """
+    table_mode = table_mode or ISSUE_TABLE_MODE
+    proj = rows[0]
+    auditor = proj[17] if len(proj) > 17 else "N/A"
+    name, branch, region, start, status = proj[1], proj[2], proj[3], proj[4], proj[5]
+    bm, om, sup = proj[14], proj[15], proj[16]
+    footer_line = _project_footer_line(proj)
+
+    heading = doc.add_heading(f"Project: {name}", level=1)
+    if new_page:
+        heading.paragraph_format.page_break_before = True
+    if shared_footer:
+        doc.add_paragraph(footer_line, style=PROJECT_FOOTER_STYLE)
+    for label, value in [
+        ("Branch", branch),
+        ("Branch Manager", bm),
+        ("Auditor(s)", auditor)
+    ]:
+        para = doc.add_paragraph()
+        para.add_run(f"{label}: ").bold = True
+        para.add_run(str(value or "N/A"))
 
-        footer_line = f"Branch: {branch} | Region: {region} | Start: {start} | BM: {bm} | OM: {om} | Sup: {sup} | Auditors: {auditor}"
-        p = footer.add_paragraph(footer_line)
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.runs[0]
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(0, 51, 102)
+    doc.add_paragraph()
 
-        for issue in rows:
-            issue_title = issue[6] or "Untitled Issue"
-            doc.add_heading(f"Issue: {issue_title}", level=2)
+    for issue in rows:
+        issue_title = issue[6] or "Untitled Issue"
+        doc.add_heading(f"Issue: {issue_title}", level=2)
+
+        desc_text, desc_tables = clean_html_and_extract_tables(issue[8])
+        impl_text, _ = clean_html_and_extract_tables(issue[9])
+        rec_text, rec_tables = clean_html_and_extract_tables(issue[13])
+
+        cost_impact = issue[10]
+        if isinstance(cost_impact, str):
+            cost_impact = cost_impact.replace("$", "").strip()
+        try:
+            cost_impact = float(cost_impact)
+        except Exception:
+            cost_impact = 0
+
+        fields = [
+            ("Severity", issue[7]),
+            ("Description", desc_text),
+            ("Implication", impl_text),
+            ("Cost Impact", f"{cost_impact:,.2f}"),
+            ("Management Comment 1", issue[11]),
+            ("Management Comment 2", issue[12]),
+            ("Recommendation", rec_text),
+        ]
+
+        nested = {"Description": desc_tables, "Recommendation": rec_tables}
+        if table_mode == "template":
+            _add_issue_table_fast(doc, fields, nested)
+        else:
+            _add_issue_table(doc, fields, nested)
+
+        doc.add_paragraph()
 
-            desc_text, desc_tables = clean_html_and_extract_tables(issue[8])
-            impl_text, _ = clean_html_and_extract_tables(issue[9])
-            rec_text, rec_tables = clean_html_and_extract_tables(issue[13])
 
-            cost_impact = issue[10]
-            if isinstance(cost_impact, str):
-                cost_impact = cost_impact.replace("$", "").strip()
-            try:
-                cost_impact = float(cost_impact)
-            except Exception:
-                cost_impact = 0
-
-            fields = [
-                ("Severity", issue[7]),
-                ("Description", desc_text),
-                ("Implication", impl_text),
-                ("Cost Impact", f"{cost_impact:,.2f}"),
-                ("Management Comment 1", issue[11]),
-                ("Management Comment 2", issue[12]),
-                ("Recommendation", rec_text),
-            ]
-
-            tbl = doc.add_table(rows=len(fields), cols=2)
-            tbl.style = "Table Grid"
-            tbl.autofit = False
-            tbl.allow_autofit = False
-
-            tblPr = tbl._tbl.tblPr
-            tblLayout = OxmlElement('w:tblLayout')
-            tblLayout.set(qn('w:type'), 'fixed')
-            tblPr.append(tblLayout)
-
-            tbl.columns[0].width = Inches(1.8)
-            tbl.columns[1].width = Inches(8.2)
-
-            set_table_border_color(tbl, 'FF9900')
-
-            for i, (lbl, val) in enumerate(fields):
-                c0, c1 = tbl.rows[i].cells
-                c0.text = lbl
-                c0.paragraphs[0].runs[0].bold = True
-
-                p = c1.paragraphs[0]
-                for run in p.runs:
-                    p._p.remove(run._r)
-                p.add_run(str(val or "N/A"))
-
-                nested_tables = []
-                if lbl == "Description":
-                    nested_tables = desc_tables
-                elif lbl == "Recommendation":
-                    nested_tables = rec_tables
-
-                for hdrs, rows_tbl in nested_tables:
-                    mini_table = add_mini_table_to_cell(c1, hdrs, rows_tbl)
-                    for hdr_cell in mini_table.rows[0].cells:
-                        for para in hdr_cell.paragraphs:
-                            for run in para.runs:
-                                run.font.color.rgb = RGBColor(0, 102, 204)
-
-            doc.add_paragraph()
-
-        first = False
 
-    return doc
 
 
 
 
 
 
+def _set_project_footer(section, rows):
+    """Replace `section`'s footer with the project's branch/region/manager line."""
+    footer = section.footer
+    for p in list(footer.paragraphs):
+        footer._element.remove(p._element)
+
+    p = footer.add_paragraph(_project_footer_line(rows[0]))
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = p.runs[0]
+    run.font.size = Pt(9)
+    run.font.color.rgb = RGBColor(0, 51, 102)
 
+_scratch_docs = {}
+
+def _render_project_fragment(job):
+    """
+    Process-pool worker: render one project's body into this process's scratch
+    copy of the report document and hand it back as an hb_docx.Fragment.
+    """
+    rows, shared_footer, new_page, table_mode = job
+    if shared_footer not in _scratch_docs:
+        doc, content_section, _ = _report_skeleton([], "")
+        if shared_footer:
+            _use_shared_footer(doc, content_section, "")
+        take_body_fragment(doc)  # drop the cover page
+        _scratch_docs[shared_footer] = doc
+    doc = _scratch_docs[shared_footer]
+    _add_project(doc, rows, shared_footer, new_page, table_mode)
+    return take_body_fragment(doc)
+
+def _project_bodies(doc, projects, shared_footer, workers):
+    """
+    Add each project's body to the end of `doc`, yielding its rows after each
+    one. With more than one worker the bodies are rendered in a process pool
+    and merged in order, so the caller's per-project work runs in between.
+    """
+    if workers <= 1 or len(projects) < 2:
+        for i, rows in enumerate(projects):
+            _add_project(doc, rows, shared_footer, new_page=shared_footer and i > 0)
+            yield rows
+        return
 
+    merger = FragmentMerger(doc)
+    jobs = [(rows, shared_footer, shared_footer and i > 0, ISSUE_TABLE_MODE) for i, rows in enumerate(projects)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(projects))) as pool:
+        for rows, fragment in zip(projects, pool.map(_render_project_fragment, jobs)):
+            merger.add(fragment)
+            yield rows
+
+def _add_issue_table(doc, fields, nested):
+    """The issue's 2-column label/value table, built through python-docx."""
+    tbl = doc.add_table(rows=len(fields), cols=2)
+    tbl.style = "Table Grid"
+    tbl.autofit = False
+    tbl.allow_autofit = False
+
+    tblPr = tbl._tbl.tblPr
+    tblLayout = OxmlElement('w:tblLayout')
+    tblLayout.set(qn('w:type'), 'fixed')
+    tblPr.append(tblLayout)
+
+    tbl.columns[0].width = Inches(1.8)
+    tbl.columns[1].width = Inches(8.2)
+
+    set_table_border_color(tbl, 'FF9900')
+
+    for i, (lbl, val) in enumerate(fields):
+        c0, c1 = tbl.rows[i].cells
+        c0.text = lbl
+        c0.paragraphs[0].runs[0].bold = True
+
+        p = c1.paragraphs[0]
+        for run in p.runs:
+            p._p.remove(run._r)
+        p.add_run(str(val or "N/A"))
+
+        _add_nested_tables(c1, nested.get(lbl, []))
+    return tbl
+
+def _add_nested_tables(cell, tables):
+    for hdrs, rows_tbl in tables:
+        mini_table = add_mini_table_to_cell(cell, hdrs, rows_tbl)
+        for hdr_cell in mini_table.rows[0].cells:
+            for para in hdr_cell.paragraphs:
+                for run in para.runs:
+                    run.font.color.rgb = RGBColor(0, 102, 204)
+
+_issue_table_templates = {}
+
+def _issue_table_template(doc, labels):
+    """
+    FragmentTemplate of _add_issue_table's output for these labels, built once
+    per (labels, page width) by rendering a probe table and removing it again.
+    """
+    key = (labels, doc._block_width)
+    if key not in _issue_table_templates:
+        slots = [f"HBSLOT{i}" for i in range(len(labels))]
+        probe = _add_issue_table(doc, list(zip(labels, slots)), {})
+        probe._tbl.getparent().remove(probe._tbl)
+        _issue_table_templates[key] = FragmentTemplate(probe._tbl, slots)
+    return _issue_table_templates[key]
+
+def _add_issue_table_fast(doc, fields, nested):
+    """
+    Same XML as _add_issue_table from a precompiled fragment: the values are
+    escaped into the template and the table goes into the body in one append.
+    Nested mini tables (rare) are still added through python-docx.
+    """
+    labels = tuple(lbl for lbl, _ in fields)
+    template = _issue_table_template(doc, labels)
+    tbl_el = template.render(*(str(val or "N/A") for _, val in fields))
+    doc._body._element._insert_tbl(tbl_el)
+    tbl = Table(tbl_el, doc._body)
+    if any(nested.get(lbl) for lbl in labels):
+        for row, lbl in zip(tbl.rows, labels):
+            _add_nested_tables(row.cells[1], nested.get(lbl, []))
+    return tbl
 
 def update_footer(section, branch, region, start_date):
     footer = section.footer
@@ -599,9 +863,9 @@ def deep_find_comments(data):
 
                 # check attribute names (like custom_attributes entries)
                 if not cm1 and any(k_l == key for key in keys_1) and isinstance(v, str):
-                    cm1 = BeautifulSoup(v, "html.parser").get_text().strip()
+                    cm1 = html_to_text(v, separator="")
                 if not cm2 and any(k_l == key for key in keys_2) and isinstance(v, str):
-                    cm2 = BeautifulSoup(v, "html.parser").get_text().strip()
+                    cm2 = html_to_text(v, separator="")
 
                 walk(v)
 
@@ -610,7 +874,7 @@ def deep_find_comments(data):
                 walk(item)
 
         elif isinstance(obj, str):
-            text = BeautifulSoup(obj, "html.parser").get_text().strip()
+            text = html_to_text(obj, separator="")
 
             if not cm1:
                 m1 = pat1.search(text)
@@ -670,25 +934,9 @@ pat1 = re.compile(r"(?:Management|Manager)?\s*Comment\s*1[:\-–]?\s*(.+)", re.I
 pat2 = re.compile(r"(?:Management|Manager)?\s*Comment\s*2[:\-–]?\s*(.+)", re.IGNORECASE)
 
 # ─── UTILITIES ────────────────────────────────────────
-def clean_html(txt):
-    """Strip HTML tags, convert <br> to newline."""
-    soup = BeautifulSoup(txt, "html.parser")
-    for br in soup.find_all("br"): br.replace_with("\n")
-    return soup.get_text().strip()
-
 def convert_pdf_to_text(pdf_bytes: bytes) -> str:
-    """Save PDF temp→DOCX→extract text via pdf2docx."""
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as fp_pdf:
-        fp_pdf.write(pdf_bytes)
-        fp_pdf.flush()
-        docx_path = fp_pdf.name + ".docx"
-        Converter(fp_pdf.name).convert(docx_path, start=0, end=None).close()
-    # now read docx as plain text
-    text = []
-    from docx import Document
-    for p in Document(docx_path).paragraphs:
-        text.append(p.text)
-    return "\n".join(text)
+    """PDF text layer via PyMuPDF, pdf2docx as the fallback (see hb_attachments.py)."""
+    return extract_text(pdf_bytes, mime_type="application/pdf")
 
 def deep_list_all_fields(obj, prefix=""):
     """
@@ -762,26 +1010,69 @@ def add_footer_with_page_number(section):
     run._r.append(instrText)
     run._r.append(fldChar2)
 
+def _download_attachment(att_id):
+    """Stream one attachment (size-capped, see hb_attachments.read_capped) → Attachment or None."""
+    url = f"{BASE_URL}/attachments/{att_id}/content"
+    logger.debug(f"Fetching attachment {att_id} → {url}")
+    r = session_get(url, timeout=15, stream=True)
+    if not r.ok:
+        r.close()
+        logger.warning(f"Failed to download attachment {att_id}: {r.status_code}")
+        return None
+    disp = r.headers.get("Content-Disposition","")
+    fn = re.search(r'filename="?(.*?)"?(;|$)', disp)
+    name = fn.group(1) if fn else f"attachment_{att_id}"
+    return Attachment(att_id, name, read_capped(r), r.headers.get("Content-Type"))
+
+def issue_attachment_ids(issue):
+    rel = issue.get("relationships", {}).get("attachments", {}).get("data", [])
+    return [meta.get("id") for meta in rel if meta.get("id")]
+
+def download_issue_attachments(issue):
+    """
+    Download an issue's attachments concurrently → [Attachment(id, filename, bytes, mime_type)]
+    """
+    ids = issue_attachment_ids(issue)
+    if not ids:
+        return []
+
+    def _safe_download(att_id):
+        try:
+            return _download_attachment(att_id)
+        except AttachmentTooLarge as e:
+            logger.warning(f"Skipping attachment {att_id}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(len(ids), ISSUE_FETCH_WORKERS)) as pool:
+        return [att for att in pool.map(_safe_download, ids) if att is not None]
+
 def fetch_issue_attachments(issue):
     """
     If an issue has attachments, download and return dict {filename: bytes}
     """
-    atts = {}
-    rel = issue.get("relationships", {}).get("attachments", {}).get("data", [])
-    for meta in rel:
-        att_id = meta.get("id")
-        if not att_id: continue
-        url = f"{BASE_URL}/attachments/{att_id}/content"
-        logger.debug(f"Fetching attachment {att_id} → {url}")
-        r = session.get(url, headers=HEADERS, timeout=15)
-        if r.ok:
-            disp = r.headers.get("Content-Disposition","")
-            fn = re.search(r'filename="?(.*?)"?(;|$)', disp)
-            name = fn.group(1) if fn else f"attachment_{att_id}"
-            atts[name] = r.content
-        else:
-            logger.warning(f"Failed to download attachment {att_id}: {r.status_code}")
-    return atts
+    return {att.name: att.data for att in download_issue_attachments(issue)}
+
+# Attachment text: extractor picked by magic bytes / MIME type, PDFs on a process pool, cached by content hash.
+# Built on first use: opening the SQLite text cache at import would cost every run (and every render worker).
+_attachment_texts = None
+_attachment_texts_lock = threading.Lock()
+
+def attachment_texts():
+    global _attachment_texts
+    with _attachment_texts_lock:
+        if _attachment_texts is None:
+            _attachment_texts = AttachmentTexts()
+        return _attachment_texts
+
+def log_attachment_metrics():
+    if _attachment_texts is None:
+        return
+    st = _attachment_texts.stats_snapshot()
+    if st["downloaded"] or st["download_avoided"] or st["too_large"]:
+        logger.info(
+            f"📎 Attachments: {st['downloaded']} downloaded, {st['download_avoided']} downloads avoided, "
+            f"{st['too_large']} over the size cap, {st['extracted']} converted, {st['cached']} from text cache"
+        )
 
 def extract_comments_from_text(text):
     """Run both regexes on a block of text and return (cm1, cm2) or empty."""
@@ -815,53 +1106,61 @@ def deep_find_comments(data):
     return cm1, cm2
 
 # ─── CORE COMMENT EXTRACTION ────────────────────────────
-def find_management_comments(issue, project_custom_attrs):
+def comment_candidates(issue, project_custom_attrs):
     """
-    1) Gather ALL candidate texts from:
+    Yield candidate texts lazily, in priority order:
        • issue["custom_attributes"]
        • issue top-level fields
        • project_custom_attrs (fallback)
-       • attachments (PDF/DOCX/plain) 
-    2) Try regex on each, in priority order
+       • attachments (PDF/DOCX/plain), downloaded only if the consumer gets this far
+    Close the generator early and the issue's attachments count as downloads avoided.
+    """
+    ia = issue.get("attributes", {})
+    att_ids = issue_attachment_ids(issue)
+    reached_attachments = False
+    try:
+        # A) Issue custom_attributes
+        for c in ia.get("custom_attributes", []):
+            term = c.get("term") or c.get("label") or ""
+            val  = c.get("value","")
+            if isinstance(val, str):
+                logger.debug(f"Found custom attribute '{term}'")
+                yield clean_html(val)
+
+        # B) Top-level issue fields
+        for fld, val in ia.items():
+            if isinstance(val, str) and any(w in fld.lower() for w in ("comment","custom","field")):
+                logger.debug(f"Found top-level field '{fld}'")
+                yield clean_html(val)
+
+        # C) Project-level fallback (attributes from parent project)
+        for term, val in project_custom_attrs:
+            if isinstance(val, str):
+                logger.debug(f"Project-level field '{term}' as fallback")
+                yield clean_html(val)
+
+        # D) Attachments: streamed + size-capped, known ids served from the text cache
+        reached_attachments = True
+        texts = attachment_texts().fetch(att_ids, _download_attachment, max_workers=ISSUE_FETCH_WORKERS)
+        for att_id, (text, e) in zip(att_ids, texts):
+            if e is not None:
+                logger.warning(f"Could not fetch/parse attachment {att_id}: {e}")
+            elif text:
+                logger.debug(f"Parsed attachment {att_id} for text")
+                yield text
+    finally:
+        if att_ids and not reached_attachments:
+            attachment_texts().skip(len(att_ids))
+
+def find_management_comments(issue, project_custom_attrs):
+    """
+    1) Walk candidate texts lazily (comment_candidates), in priority order
+    2) Stop as soon as both comments are found, so attachments are usually never downloaded
     3) Deep recursive search as last resort
     """
     logger.info(f"--- Searching Comments for Issue '{issue.get('attributes',{}).get('title','?')}' ---")
     ia = issue.get("attributes", {})
-    candidates = []
-
-    # A) Issue custom_attributes
-    for c in ia.get("custom_attributes", []):
-        term = c.get("term") or c.get("label") or ""
-        val  = c.get("value","")
-        if isinstance(val, str):
-            logger.debug(f"Found custom attribute '{term}'")
-            candidates.append(clean_html(val))
-
-    # B) Top-level issue fields
-    for fld, val in ia.items():
-        if isinstance(val, str) and any(w in fld.lower() for w in ("comment","custom","field")):
-            logger.debug(f"Found top-level field '{fld}'")
-            candidates.append(clean_html(val))
-
-    # C) Project-level fallback (attributes from parent project)
-    for term, val in project_custom_attrs:
-        if isinstance(val, str):
-            logger.debug(f"Project-level field '{term}' as fallback")
-            candidates.append(clean_html(val))
-
-    # D) Attachments
-    for name, data in fetch_issue_attachments(issue).items():
-        logger.debug(f"Parsing attachment '{name}' for text")
-        text = None
-        if name.lower().endswith(".pdf"):
-            text = convert_pdf_to_text(data)
-        else:
-            try:
-                text = data.decode("utf-8", errors="ignore")
-            except:
-                text = ""
-        if text:
-            candidates.append(text)
+    candidates = comment_candidates(issue, project_custom_attrs)
 
     # E) Run regex extraction in order
     cm1 = cm2 = ""
@@ -878,6 +1177,7 @@ def find_management_comments(issue, project_custom_attrs):
                 logger.info(f"→ Matched CM2 in candidate: {txt[:80]!r}")
         if cm1 and cm2:
             break
+    candidates.close()  # later sources (attachments) are never read
 
     # F) Deep nested search if still missing
     if not (cm1 and cm2):
@@ -947,7 +1247,7 @@ def deep_custom_field_search(data):
             for k, v in x.items():
                 k_l = str(k).lower()
                 if "custom" in k_l or "field" in k_l:
-                    val = BeautifulSoup(str(v), "html.parser").get_text(separator="\n").strip()
+                    val = html_to_text(str(v))
                     if val:
                         found_custom.append(val)
                         mc1, mc2 = extract_management_comments(val)
@@ -976,32 +1276,26 @@ def ensure_str(val):
         return ", ".join(map(str, val))
     return str(val or "")
 
+def download_attachment(url):
+    """Stream an attachment by URL (size-capped) → Attachment; the URL is its cache id."""
+    logger.debug(f"Fetching attachment: {url}")
+    resp = session_get(url, timeout=None, stream=True)
+    if not resp.ok:
+        resp.close()
+        resp.raise_for_status()
+    return Attachment(url, url.rsplit("/", 1)[-1], read_capped(resp), resp.headers.get("Content-Type"))
+
 def fetch_attachment_text(url):
     """
     Download an attachment, attempt to extract text:
-    - If .pdf → use pdf2docx
-    - If .docx → use python-docx
+    - PDF (magic bytes or MIME type) → PyMuPDF text layer, pdf2docx as fallback
+    - DOCX → word/document.xml read from the zip
     - Else → raw text.
+    PDFs convert in a worker process; text is cached by content hash.
     """
-    logger.debug(f"Fetching attachment: {url}")
-    resp = session.get(url, headers=HEADERS)
-    resp.raise_for_status()
-    content = resp.content
-    # Save to temp file by extension
-    ext = url.split('.')[-1].lower()
-    tmp = f"/tmp/temp_attachment.{ext}"
-    with open(tmp, "wb") as f:
-        f.write(content)
-    if ext == "pdf":
-        out = tmp + ".docx"
-        Converter(tmp).convert(out, start=0, end=None)
-        doc = Document(out)
-        text = "\n".join(p.text for p in doc.paragraphs)
-    elif ext in ("docx","doc"):
-        doc = Document(tmp)
-        text = "\n".join(p.text for p in doc.paragraphs)
-    else:
-        text = content.decode(errors="ignore")
+    text, error = attachment_texts().fetch([url], download_attachment)[0]
+    if error is not None:
+        raise error
     return text
 
 def extract_from_text(raw: str, idx: int) -> str:
@@ -1029,9 +1323,9 @@ def find_custom_fields(data: dict):
             for k,v in obj.items():
                 kl = str(k)
                 if key1.search(kl) and isinstance(v, str):
-                    cf1.append(BeautifulSoup(v,"html.parser").get_text())
+                    cf1.append(html_to_text(v, separator="", strip=False))
                 if key2.search(kl) and isinstance(v, str):
-                    cf2.append(BeautifulSoup(v,"html.parser").get_text())
+                    cf2.append(html_to_text(v, separator="", strip=False))
                 walk(v)
         elif isinstance(obj, list):
             for item in obj:
@@ -1039,19 +1333,6 @@ def find_custom_fields(data: dict):
     walk(data)
     return cf1, cf2
 
-def find_management_comments(cf_texts, idx):
-    """
-    From each custom-field text, pull out embedded
-    Management Comment idx or default to whole text.
-    """
-    pat = re.compile(rf"(?:Management|Manager)?\s*Comment\s*{idx}\s*[:\-–]?\s*(.+)", re.IGNORECASE)
-    for txt in cf_texts:
-        m = pat.search(txt)
-        if m:
-            return m.group(1).strip()
-    # fallback: return first text block if exists
-    return cf_texts[0].strip() if cf_texts else ""
-
 def scan_attachments_for_comments(issue_json, idx):
     """
     Look under relationships.attachments.data
@@ -1059,86 +1340,30 @@ def scan_attachments_for_comments(issue_json, idx):
     """
     comments = []
     rels = issue_json.get("relationships", {}).get("attachments", {}).get("data", [])
-    for att in rels:
-        url = att.get("links",{}).get("related")
-        if not url: 
-            continue
-        try:
-            text = fetch_attachment_text(url)
-            c = extract_from_text(text, idx)
-            if c:
-                comments.append(c)
-        except Exception as e:
+    urls = [att.get("links",{}).get("related") for att in rels]
+    urls = [url for url in urls if url]
+    if not urls:
+        return comments
+
+    # Known attachments come from the text cache; the rest download concurrently
+    # (streamed, size-capped) and convert on the process pool
+    for url, (text, e) in zip(urls, attachment_texts().fetch(urls, download_attachment, max_workers=ISSUE_FETCH_WORKERS)):
+        if e is not None:
             logger.warning(f"Could not fetch/parse attachment {url}: {e}")
+            continue
+        c = extract_from_text(text or "", idx)
+        if c:
+            comments.append(c)
     return comments
 
 
-def extract_management_comments(custom_attributes):
-    if not custom_attributes:
-        return "", ""
-    cm = {
-        (c.get("term") or "").strip().lower(): c.get("value", "")
-        for c in custom_attributes
-    }
-
-    mgmt_comment_1 = ""
-    mgmt_comment_2 = ""
-
-    # 🔄 Updated patterns allow multiple spaces/underscores/dashes, plural Comments/Fields
-    patterns_1 = [
-        re.compile(r"management[\s_\-]*comments?[\s_\-]*1"),
-        re.compile(r"custom[\s_\-]*fields?[\s_\-]*1"),
-        re.compile(r"mgmt[\s_\-]*comments?[\s_\-]*1"),
-    ]
-    patterns_2 = [
-        re.compile(r"management[\s_\-]*comments?[\s_\-]*2"),
-        re.compile(r"custom[\s_\-]*fields?[\s_\-]*2"),
-        re.compile(r"mgmt[\s_\-]*comments?[\s_\-]*2"),
-    ]
-
-    for key, value in cm.items():
-        if any(pat.search(key) for pat in patterns_1):
-            mgmt_comment_1 = value
-            break
-
-    for key, value in cm.items():
-        if any(pat.search(key) for pat in patterns_2):
-            mgmt_comment_2 = value
-            break
-
-    return mgmt_comment_1, mgmt_comment_2
-
-
-def clean_html(raw):
-    """Clean HTML, strip <p>, <br>, other tags, normalize spaces & remove leading/trailing junk."""
-    if not raw:
-        return ''
-    if isinstance(raw, list):
-        raw = "\n".join(raw)
-    # Replace common tags with newlines
-    raw = re.sub(r'</p>', '\n', raw, flags=re.IGNORECASE)
-    raw = re.sub(r'<br\s*/?>', '\n', raw, flags=re.IGNORECASE)
-    # Remove all other HTML tags
-    raw = re.sub(r'<[^>]+>', '', raw)
-    # Replace &nbsp; with regular space
-    raw = raw.replace('&nbsp;', ' ')
-    # For each line, strip leading/trailing spaces and collapse internal multiple spaces
-    lines = []
-    for line in raw.splitlines():
-        line = line.strip()
-        # Also normalize multiple spaces inside line to single spaces
-        line = re.sub(r'[ \t\u00A0]+', ' ', line)
-        lines.append(line)
-    # Join cleaned lines, remove any empty lines caused by cleaning
-    cleaned = '\n'.join(filter(None, lines))
-    return cleaned.strip()
-
-
 import argparse
 import sys
 import re
 from datetime import datetime
 
+from hb_comments import clean_html, extract_comments, term_comments
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate Regional Issues Report from HighBond projects"
@@ -1146,6 +1371,20 @@ def main():
     parser.add_argument("--region")
     parser.add_argument("--month")
     parser.add_argument("--severity")
+    parser.add_argument("--workers", type=int, default=ISSUE_FETCH_WORKERS,
+                        help="Concurrent issue requests (default: %(default)s)")
+    parser.add_argument("--cache", choices=["on", "offline", "off"], default=CACHE_MODE,
+                        help="HTTP response cache; 'offline' re-renders from cache only")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch projects updated since the last run (local snapshot)")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="With --incremental, rebuild the snapshot from scratch")
+    parser.add_argument("--render-workers", type=int, default=RENDER_WORKERS,
+                        help="Processes rendering project sections (default: %(default)s)")
+    parser.add_argument("--stream", action="store_true", default=REPORT_STREAM,
+                        help="Write the report project by project instead of building it in memory")
+    parser.add_argument("--attachment-comments", action="store_true", default=ATTACHMENT_COMMENTS,
+                        help="Look for missing management comments in issue attachments (downloads them)")
     args, _ = parser.parse_known_args()
 
     # Prompt and normalize
@@ -1162,36 +1401,56 @@ def main():
             logger.error("Invalid month format. Use YYYY-MM.")
             sys.exit(1)
 
-    projects = get_all_projects()
+    if args.workers > ISSUE_FETCH_WORKERS or args.cache != CACHE_MODE:
+        mount_adapter(max(args.workers, ISSUE_FETCH_WORKERS), cache_mode=args.cache)
+
+    projects = get_all_projects(month=mf or None, incremental=args.incremental, full_sync=args.full_sync)
     projects.sort(key=lambda p: p["attributes"].get("start_date", "" \
     ""), reverse=True)
     logger.info(f"📦 Retrieved {len(projects)} valid projects")
 
-    data = []
-
+    selected = []
     for p in projects:
         attr = p["attributes"]
-        project_name = attr.get("name", "")
         start = attr.get("start_date", "")
 
         if mf and not start.startswith(mf):
             continue
 
-        pid = p["id"]
         ca = attr.get("custom_attributes", [])
-
         region = ensure_str(next((c["value"] for c in ca if c.get("term") == "Region"), ""))
         if rf and rf != "all" and rf not in region.lower():
             continue
 
+        selected.append((p, region))
+
+    issues_by_project = get_issues_for_projects(
+        [p["id"] for p, _ in selected],
+        max_workers=args.workers,
+        params=issue_query_params(
+            sev_set, ISSUE_FIELDS + ("attachments",) if args.attachment_comments else ISSUE_FIELDS
+        ),
+    )
+
+    data = []
+
+    for (p, region), project_issues in zip(selected, issues_by_project):
+        attr = p["attributes"]
+        project_name = attr.get("name", "")
+        start = attr.get("start_date", "")
+        pid = p["id"]
+        ca = attr.get("custom_attributes", [])
+
         branch = ensure_str(next((c["value"] for c in ca if c.get("term") == "Branch"), ""))
         bm = ensure_str(next((c["value"] for c in ca if c.get("term") == "Branch Manager"), ""))
         om = ensure_str(next((c["value"] for c in ca if c.get("term") == "Operations Manager"), ""))
         sup = ensure_str(next((c["value"] for c in ca if c.get("term") == "Supervisor"), ""))
         auditors = ensure_str(next((c["value"] for c in ca if c.get("term") == "Auditor(s)"), ""))
         auditor_names = ", ".join(auditors) if auditors else "N/A"
+        project_comments = term_comments(ca, "project")
+        project_custom_attrs = [(c.get("term") or "", c.get("value")) for c in ca] if args.attachment_comments else None
 
-        for isd in get_project_issues(pid):
+        for isd in project_issues:
             ia = isd.get("attributes", {})
             issue_title = ia.get("title", "") or "Untitled Issue"
             sev = ia.get("severity", "").strip().lower()
@@ -1200,36 +1459,13 @@ def main():
             if sev_set and sev not in sev_set:
                 continue
 
-            cm1, cm2 = "", ""
-            cm1_raw, cm2_raw = extract_management_comments(ia.get("custom_attributes", []))
-            cm1 = clean_html(cm1_raw)
-            cm2 = clean_html(cm2_raw)
-
-            if not cm1 or not cm2:
-                proj_cm1_raw, proj_cm2_raw = extract_management_comments(ca)
-                if not cm1:
-                    cm1 = clean_html(proj_cm1_raw)
-                if not cm2:
-                    cm2 = clean_html(proj_cm2_raw)
-
-            if not cm1 or not cm2:
-                for field in ["description", "effect", "recommendation"]:
-                    val = ia.get(field, "")
-                    text = BeautifulSoup(str(val), "html.parser").get_text(separator="\n").strip()
-                    if text:
-                        if not cm1:
-                            cm1 = text
-                        elif not cm2 and text != cm1:
-                            cm2 = text
-                    if cm1 and cm2:
-                        break
-
-            if not cm1 or not cm2:
-                _, deep_cm1, deep_cm2 = deep_custom_field_search(ia)
-                if deep_cm1 and not cm1:
-                    cm1 = clean_html(deep_cm1)
-                if deep_cm2 and not cm2:
-                    cm2 = clean_html(deep_cm2)
+            cm1, cm2, cm1_src, cm2_src = extract_comments(ia, project_comments)
+            if args.attachment_comments and not (cm1 and cm2):
+                # Lazy fallback chain; attachments are only downloaded if nothing else has the comment
+                f1, f2 = find_management_comments(isd, project_custom_attrs)
+                cm1, cm1_src = (cm1, cm1_src) if cm1 else (f1, "fallback" if f1 else cm1_src)
+                cm2, cm2_src = (cm2, cm2_src) if cm2 else (f2, "fallback" if f2 else cm2_src)
+            logger.debug(f"💬 {issue_title}: comment 1 from {cm1_src or 'nowhere'}, comment 2 from {cm2_src or 'nowhere'}")
 
             cost = ia.get("cost_impact")
             cost = cost if isinstance(cost, (int, float)) else 0.0
@@ -1263,9 +1499,14 @@ def main():
     safe_mf = re.sub(r"\W+", "_", mf or "ALL")
     out_fn = f"project_report_{safe_rf}_{safe_mf}.docx"
 
-    doc = create_word_report(data, rf or "ALL", sorted(sev_set) or ["High", "Medium", "Low"])
-    doc.save(out_fn)
+    severities = sorted(sev_set) or ["High", "Medium", "Low"]
+    if args.stream:
+        create_word_report(data, rf or "ALL", severities, stream_to=out_fn, render_workers=args.render_workers)
+    else:
+        doc = create_word_report(data, rf or "ALL", severities, render_workers=args.render_workers)
+        doc.save(out_fn)
     logger.info(f"✅ Report saved: {out_fn}")
+    log_attachment_metrics()
 
 
 
@@ -13,6 +13,9 @@ from urllib.parse import urljoin
 import json
 from datetime import datetime as dt
 
+from hb_cache import mount_cache
+from hb_pages import iter_records
+
 
 ####################################################################################
 # fetch data
@@ -25,9 +28,10 @@ BASE_URL = f'https://apis-eu.diligentoneplatform.com/v1/orgs/{org_id}/projects'
 headers = {'Authorization' : f'Bearer {BEARER_TOKEN}', 'Content-Type': 'application/vnd.api+json'}
 params = {'filter[status]':'active', 'filter[start_date][lte]': dt.today().isoformat(), 'include':'project, project.fieldwork'}
 
-def fetch_data(url, params=params, max_retries=5, timeout=10, backoff_factor=1):
+def iter_data(url, params=params, max_retries=5, timeout=10, backoff_factor=1):
     """
-        fetch data from endpoint with maxixum retries, timeout and session management
+        stream records from a paginated endpoint as each page arrives, with maximum retries,
+        timeout and session management. failures are printed and re-raised.
 
         Args:
             url(str): targeted endpoint
@@ -37,33 +41,26 @@ def fetch_data(url, params=params, max_retries=5, timeout=10, backoff_factor=1):
     """
     retries = Retry(total= max_retries, 
                     backoff_factor=backoff_factor, 
-                    status_forcelist=[429, 500, 502, 503, 504], #retries on these http errors
+                    status_forcelist=[500, 502, 504], #retries on these http errors; 429/503 go to the rate limiter
                     allowed_methods=['GET'])
-    session = requests.session()
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount('http://',adapter)
-    session.mount('https://', adapter)
-    all_data = []
-    while url:
+    with requests.session() as session:
+        mount_cache(session, max_retries=retries) # on-disk response cache + shared rate limiter, see hb_cache.py
         try:
-            resp = session.get(url, headers=headers, params=params, timeout=10)
-            resp.raise_for_status()
-        except Exception as e:
+            yield from iter_records(session, url, params=params, headers=headers, base_url=server_url, timeout=timeout)
+        except requests.RequestException as e:
             print(f'failure to fetch data: {e}')
-        all_data = all_data + resp.json()['data']
-
-        next_page = resp.json()['links']['next']
-        url = urljoin(server_url,next_page) if next_page else None
-        params = None
-    session.close()
-    return all_data
+            raise
 
-# fetch project data ***************************************************************
-projects = fetch_data(BASE_URL)
+def fetch_data(url, params=params, max_retries=5, timeout=10, backoff_factor=1):
+    """
+        fetch all records from an endpoint into a list (see iter_data to stream them instead)
+    """
+    return list(iter_data(url, params=params, max_retries=max_retries, timeout=timeout, backoff_factor=backoff_factor))
 
-# fetch planning data **************************************************************
+# fetch project + planning data *****************************************************
+# projects are streamed straight into the planning-file requests
 project_plannings = {}
-for project in projects:
+for project in iter_data(BASE_URL):
     project_id = project['id']
     BASE_URL = f'https://apis-eu.diligentoneplatform.com/v1/orgs/{org_id}/projects/{project_id}/planning_files'
     plannings = fetch_data(BASE_URL, params=None)
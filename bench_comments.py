@@ -0,0 +1,194 @@
+"""
+Benchmark: management-comment extraction, legacy fallback chain vs hb_comments.
+
+    python bench_comments.py            # 50k synthetic issues
+    python bench_comments.py --issues 5000
+
+The legacy chain is the one Project_report.main() ran per issue before
+hb_comments: term lookup with per-call regexes on the issue then the project,
+BeautifulSoup on description/effect/recommendation, then the deep custom-field
+walk. (Its deep walk called the custom-attribute `extract_management_comments`
+on plain strings and crashed; here it uses the plain-text variant it meant.)
+"""
+import argparse
+import random
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from hb_comments import clean_html, extract_comments, term_comments
+
+
+# ─── Synthetic issues ───────────────────────────────────────
+WORDS = "cash till branch loan review control reconciliation overdue vault policy staff limit".split()
+
+
+def _sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _html(rng):
+    return f"<p>{_sentence(rng)}</p><p><strong>{_sentence(rng, 6)}</strong><br/>{_sentence(rng)}</p>"
+
+
+def make_issue(rng):
+    kind = rng.random()
+    attrs = {
+        "title": _sentence(rng, 5),
+        "severity": rng.choice(["High", "Medium", "Low"]),
+        "description": _html(rng),
+        "effect": _html(rng),
+        "recommendation": _html(rng),
+        "custom_attributes": [
+            {"id": 1, "term": "Root Cause", "value": _sentence(rng)},
+            {"id": 2, "term": "Owner", "value": "Branch Manager"},
+        ],
+    }
+    if kind < 0.4:
+        attrs["custom_attributes"] += [
+            {"id": 3, "term": "Management Comment 1", "value": _html(rng)},
+            {"id": 4, "term": "Management Comment 2", "value": _html(rng)},
+        ]
+    elif kind < 0.6:
+        attrs["custom_attributes"].append({"id": 5, "term": "Custom Field 1", "value": _html(rng)})
+    elif kind < 0.9:
+        attrs["effect"] = ""
+    else:
+        attrs["description"] = attrs["effect"] = attrs["recommendation"] = ""
+        attrs["custom_attributes"].append(
+            {"id": 6, "term": "Notes", "value": f"Management Comment 1: {_sentence(rng)}\nManagement Comment 2: {_sentence(rng)}"}
+        )
+    return attrs
+
+
+def make_project(rng):
+    ca = [{"term": "Region", "value": "North"}, {"term": "Branch", "value": "Main"}]
+    if rng.random() < 0.5:
+        ca.append({"term": "Mgmt Comment 2", "value": _html(rng)})
+    return ca
+
+
+# ─── Legacy chain ───────────────────────────────────────────
+def legacy_term_comments(custom_attributes):
+    if not custom_attributes:
+        return "", ""
+    cm = {(c.get("term") or "").strip().lower(): c.get("value", "") for c in custom_attributes}
+    mgmt_comment_1 = mgmt_comment_2 = ""
+    patterns_1 = [
+        re.compile(r"management[\s_\-]*comments?[\s_\-]*1"),
+        re.compile(r"custom[\s_\-]*fields?[\s_\-]*1"),
+        re.compile(r"mgmt[\s_\-]*comments?[\s_\-]*1"),
+    ]
+    patterns_2 = [
+        re.compile(r"management[\s_\-]*comments?[\s_\-]*2"),
+        re.compile(r"custom[\s_\-]*fields?[\s_\-]*2"),
+        re.compile(r"mgmt[\s_\-]*comments?[\s_\-]*2"),
+    ]
+    for key, value in cm.items():
+        if any(pat.search(key) for pat in patterns_1):
+            mgmt_comment_1 = value
+            break
+    for key, value in cm.items():
+        if any(pat.search(key) for pat in patterns_2):
+            mgmt_comment_2 = value
+            break
+    return mgmt_comment_1, mgmt_comment_2
+
+
+def legacy_text_comments(text):
+    pat1 = re.compile(r"(?:Management|Manager)?\s*Comment\s*1[:\-–]?\s*(.+)", re.IGNORECASE)
+    pat2 = re.compile(r"(?:Management|Manager)?\s*Comment\s*2[:\-–]?\s*(.+)", re.IGNORECASE)
+    text = text.strip()
+    m1, m2 = pat1.search(text), pat2.search(text)
+    return (m1.group(1).strip() if m1 else ""), (m2.group(1).strip() if m2 else "")
+
+
+def legacy_deep_search(data):
+    found = {"mc1": "", "mc2": ""}
+
+    def take(mc1, mc2):
+        if mc1 and not found["mc1"]:
+            found["mc1"] = mc1
+        if mc2 and not found["mc2"]:
+            found["mc2"] = mc2
+
+    def walk(x):
+        if isinstance(x, dict):
+            for k, v in x.items():
+                k_l = str(k).lower()
+                if "custom" in k_l or "field" in k_l:
+                    val = BeautifulSoup(str(v), "html.parser").get_text(separator="\n").strip()
+                    if val:
+                        take(*legacy_text_comments(val))
+                walk(v)
+        elif isinstance(x, list):
+            for i in x:
+                walk(i)
+        elif isinstance(x, str):
+            take(*legacy_text_comments(x))
+
+    walk(data)
+    return found["mc1"], found["mc2"]
+
+
+def legacy_extract(ia, ca):
+    cm1_raw, cm2_raw = legacy_term_comments(ia.get("custom_attributes", []))
+    cm1, cm2 = clean_html(cm1_raw), clean_html(cm2_raw)
+    if not cm1 or not cm2:
+        proj_cm1_raw, proj_cm2_raw = legacy_term_comments(ca)
+        cm1 = cm1 or clean_html(proj_cm1_raw)
+        cm2 = cm2 or clean_html(proj_cm2_raw)
+    if not cm1 or not cm2:
+        for field in ["description", "effect", "recommendation"]:
+            text = BeautifulSoup(str(ia.get(field, "")), "html.parser").get_text(separator="\n").strip()
+            if text:
+                if not cm1:
+                    cm1 = text
+                elif not cm2 and text != cm1:
+                    cm2 = text
+            if cm1 and cm2:
+                break
+    if not cm1 or not cm2:
+        deep_cm1, deep_cm2 = legacy_deep_search(ia)
+        cm1 = cm1 or clean_html(deep_cm1)
+        cm2 = cm2 or clean_html(deep_cm2)
+    return cm1, cm2
+
+
+# ─── Runner ─────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--issues", type=int, default=50_000)
+    parser.add_argument("--per-project", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    projects = [make_project(rng) for _ in range(max(1, args.issues // args.per_project))]
+    issues = [(make_issue(rng), projects[i // args.per_project % len(projects)]) for i in range(args.issues)]
+
+    started = time.perf_counter()
+    before = [legacy_extract(ia, ca) for ia, ca in issues]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    project_comments = {}
+    after = []
+    for ia, ca in issues:
+        key = id(ca)
+        if key not in project_comments:
+            project_comments[key] = term_comments(ca, "project")
+        after.append(extract_comments(ia, project_comments[key]))
+    engine_s = time.perf_counter() - started
+
+    differing = sum(1 for old, new in zip(before, after) if old != (new.cm1, new.cm2))
+    print(f"issues:          {args.issues}")
+    print(f"legacy chain:    {legacy_s:8.2f}s  {args.issues / legacy_s:10.0f} issues/s")
+    print(f"hb_comments:     {engine_s:8.2f}s  {args.issues / engine_s:10.0f} issues/s")
+    print(f"speed-up:        {legacy_s / engine_s:8.1f}x")
+    print(f"different pairs: {differing}  (legacy deep walk reads repr() of nested values)")
+
+
+if __name__ == "__main__":
+    main()
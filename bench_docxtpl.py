@@ -0,0 +1,141 @@
+"""
+Benchmark and equivalence check: hb_docxtpl.CompiledTemplate vs a fresh
+DocxTemplate per context, the way the template scripts render.
+
+    python bench_docxtpl.py              # 200 documents per template
+    python bench_docxtpl.py --docs 50
+
+For every template below, both ways render the same contexts. The rendered
+parts (document.xml, templated headers) must be byte-for-byte equal. The
+relationships must point at the same targets, with the same media bytes.
+"""
+import argparse
+import io
+import posixpath
+import random
+import time
+import zipfile
+
+from docx.shared import Mm
+from docxtpl import DocxTemplate, InlineImage
+from lxml import etree
+
+from hb_docxtpl import BatchImage, CompiledTemplate
+
+WORDS = "cash till branch loan review control reconciliation overdue vault policy staff limit".split()
+
+
+def _words(rng, n=4):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def invite(rng):
+    return {
+        "todayStr": "2025-08-01", "recipientName": _words(rng, 2).title(), "evntDtStr": "2025-08-30",
+        "venueStr": _words(rng, 2) + " & <hotel>", "senderName": "Gabriel",
+        "bannerImg": BatchImage(f"images/party_banner_{rng.randint(0, 2)}.png", Mm(120)),
+    }
+
+
+def sales(rng):
+    rows = [{"name": f"Item {i + 1}", "cPu": rng.randint(1, 10), "nUnits": rng.randint(5, 14)} for i in range(rng.randint(3, 12))]
+    for row in rows:
+        row["revenue"] = row["cPu"] * row["nUnits"]
+    return {"reportDtStr": "2025-08-01", "salesTblRows": rows, "topItemsRows": [r["name"] for r in rows[:3]],
+            "trendImg": BatchImage("images/sales_visuals.png", Mm(100))}
+
+
+def dynamic_table(rng):
+    labels = [rng.choice(WORDS) for _ in range(rng.randint(2, 6))]
+    return {"col_labels": labels,
+            "tbl_contents": [{"label": rng.choice(WORDS), "cols": [_words(rng, 2) for _ in labels]} for _ in range(rng.randint(1, 8))]}
+
+
+def risks(rng):
+    return {"risks": [
+        {"id": f"R{r}", "description": _words(rng, 12), "rating": "VH(16)", "sites": [
+            {"site": rng.choice(["Nairobi", "Head Office", "Mombasa"]), "findings": [
+                {"finding": _words(rng, 8), "ref": str(rng.randint(1, 40)), "opinion": rng.choice(["", "Inadequate design"])}
+                for _ in range(rng.randint(1, 4))]}
+            for _ in range(rng.randint(1, 3))]}
+        for r in range(rng.randint(1, 5))]}
+
+
+def impact(rng):
+    return {"project": _words(rng, 3).title(), "mysubdoc1": "", "mysubdoc2": ""}
+
+
+TEMPLATES = [
+    ("Report_templates/inviteTmpl.docx", invite),
+    ("Report_templates/reportTmpl.docx", sales),
+    ("Report_templates/dynamic_table_tpl.docx", dynamic_table),
+    ("Report_templates/Risk_tmp.docx", risks),
+    ("Report_templates/impact_report_tpl.docx", impact),
+]
+
+
+def reference(path, context):
+    tpl = DocxTemplate(path)
+    context = {k: InlineImage(tpl, *v) if isinstance(v, BatchImage) else v for k, v in context.items()}
+    tpl.render(context)
+    buf = io.BytesIO()
+    tpl.save(buf)
+    return buf.getvalue()
+
+
+def compiled(template, context):
+    buf = io.BytesIO()
+    template.save(context, buf)
+    return buf.getvalue()
+
+
+def differences(expected, got, rendered_parts):
+    with zipfile.ZipFile(io.BytesIO(expected)) as a, zipfile.ZipFile(io.BytesIO(got)) as b:
+        problems = [name for name in rendered_parts if a.read(name) != b.read(name)]
+
+        def linked(zf, rels_name):
+            folder = rels_name.split("_rels/")[0]
+            root = etree.fromstring(zf.read(rels_name))
+            return sorted((r.get("Type"), r.get("TargetMode") == "External",
+                           zf.read(posixpath.normpath(posixpath.join(folder, r.get("Target"))).lstrip("/"))
+                           if r.get("Target").startswith("media/") else r.get("Target"))
+                          for r in root)
+
+        for name in a.namelist():
+            if name.endswith(".rels") and name.startswith("word/") and linked(a, name) != linked(b, name):
+                problems.append(name)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failed = 0
+    for path, make in TEMPLATES:
+        contexts = [make(rng) for _ in range(args.docs)]
+
+        started = time.perf_counter()
+        expected = [reference(path, ctx) for ctx in contexts]
+        ref_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        template = CompiledTemplate(path)
+        got = [compiled(template, ctx) for ctx in contexts]
+        new_s = time.perf_counter() - started
+
+        rendered_parts = [tp.zipname for tp in template.parts]
+        bad = [(i, d) for i, (e, g) in enumerate(zip(expected, got)) if (d := differences(e, g, rendered_parts))]
+        failed += len(bad)
+        print(f"{path.split('/')[-1]:28} DocxTemplate {args.docs / ref_s:7.0f} docs/s  compiled {args.docs / new_s:7.0f} docs/s"
+              f"  {ref_s / new_s:5.1f}x  mismatches: {len(bad)}")
+        for index, parts in bad[:3]:
+            print(f"    context {index}: {parts}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark and parity check: hb_html vs the BeautifulSoup code it replaced.
+
+    python bench_html.py                 # 20k synthetic rich-text fields
+    python bench_html.py --fields 2000 --fuzz 5000
+
+Every converter is run on the same inputs both ways and any output that
+differs is printed. The inputs mix HighBond-style rich text (paragraphs,
+lists, tables, entities), plain strings with no markup, and with --fuzz
+randomly nested broken markup (unclosed tags, stray end tags, script/pre,
+CDATA, odd character references).
+"""
+import argparse
+import random
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+import hb_html
+from hb_html import html_text_and_tables, html_to_text
+
+
+# ─── BeautifulSoup reference ────────────────────────────────
+def bs_text(value):
+    return BeautifulSoup(value, "html.parser").get_text(separator="\n").strip()
+
+
+def bs_text_joined(value):
+    return BeautifulSoup(value, "html.parser").get_text().strip()
+
+
+def bs_text_raw(value):
+    return BeautifulSoup(value, "html.parser").get_text()
+
+
+def bs_clean_html(value):
+    soup = BeautifulSoup(value, "html.parser")
+    for br in soup.find_all("br"): br.replace_with("\n")
+    return soup.get_text().strip()
+
+
+def bs_text_and_tables(value):
+    soup = BeautifulSoup(value, "html.parser")
+    for tag in soup(["script", "style"]): tag.decompose()
+    for br in soup.find_all("br"): br.replace_with("\n")
+    for p in soup.find_all("p"): p.insert_after("\n")
+    tables = []
+    for tbl in soup.find_all("table"):
+        headers = [th.get_text(strip=True) for th in tbl.find_all("th")]
+        rows = [
+            [td.get_text(strip=True) for td in tr.find_all("td")]
+            for tr in tbl.find_all("tr")
+            if any(td.get_text(strip=True) for td in tr.find_all("td"))
+        ]
+        tables.append((headers, rows))
+        tbl.decompose()
+    text = soup.get_text(separator="\n").strip().replace("$", "")
+    return re.sub(r"\n+", "\n", text), tables
+
+
+CHECKS = [
+    ("get_text('\\n').strip()", bs_text, html_to_text),
+    ("get_text().strip()", bs_text_joined, lambda v: html_to_text(v, separator="")),
+    ("get_text()", bs_text_raw, lambda v: html_to_text(v, separator="", strip=False)),
+    ("clean_html", bs_clean_html, lambda v: html_to_text(v, separator="", br="\n")),
+    ("clean_html_and_extract_tables", bs_text_and_tables, html_text_and_tables),
+]
+
+
+# ─── Inputs ─────────────────────────────────────────────────
+WORDS = "cash till branch loan review control reconciliation overdue vault policy staff limit".split()
+FUZZ_TAGS = ["p", "b", "i", "span", "div", "br", "pre", "textarea", "script", "style", "table", "tr",
+             "td", "th", "ul", "li", "template", "rt", "img", "hr", "a", "strong", "tbody", "thead"]
+FUZZ_TEXT = ["Hello", "a", " \t ", "\n", "\r\n", "  ", "&amp;", "&nbsp;", "&lt;", "&#39;", "&#x41;",
+             "&#12ab;", "&#xZZ;", "&foo;", "&copy2024", "& ", "a>b", "x<y", "é", "$5",
+             "<!-- c -->", "<![CDATA[cd]]>", "<!DOCTYPE html>", "<?pi ?>"]
+
+
+def _sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def rich_text(rng):
+    kind = rng.random()
+    if kind < 0.3:
+        return _sentence(rng)  # plain text, no markup
+    parts = [f"<p>{_sentence(rng)}</p>", f"<p><strong>{_sentence(rng, 4)}</strong><br/>{_sentence(rng)}&nbsp;&amp; more</p>"]
+    if kind < 0.6:
+        parts.append("<ul>" + "".join(f"<li>{_sentence(rng, 5)}</li>" for _ in range(3)) + "</ul>")
+    if kind > 0.8:
+        rows = "".join(f"<tr><td>{rng.choice(WORDS)}</td><td>${rng.randint(1, 999)}</td></tr>" for _ in range(4))
+        parts.append(f"<table><tr><th>Item</th><th>Amount</th></tr>{rows}<tr><td></td><td> </td></tr></table>")
+    return "\n".join(parts)
+
+
+def fuzz_html(rng, depth=0):
+    out = []
+    for _ in range(rng.randint(1, 6)):
+        roll = rng.random()
+        if roll < 0.45 or depth > 4:
+            out.append(rng.choice(FUZZ_TEXT))
+        elif roll < 0.6:
+            out.append(rng.choice(["<br>", "<br/>", "<br />", "</br>", "<img>", "</img>", "<hr />", "</hr>",
+                                   f"<{rng.choice(FUZZ_TAGS)}/>", f"</{rng.choice(FUZZ_TAGS)}>"]))
+        else:
+            tag = rng.choice(FUZZ_TAGS)
+            attrs = " class='x'" if rng.random() < 0.5 else ""
+            close = f"</{tag}>" if rng.random() < 0.8 else ""
+            out.append(f"<{tag}{attrs}>{fuzz_html(rng, depth + 1)}{close}")
+    return "".join(out)
+
+
+# ─── Runner ─────────────────────────────────────────────────
+def _timed(fn, values):
+    started = time.perf_counter()
+    out = [fn(v) for v in values]
+    return out, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fields", type=int, default=20_000)
+    parser.add_argument("--distinct", type=int, default=2_000, help="distinct values among --fields")
+    parser.add_argument("--fuzz", type=int, default=3_000, help="random broken-markup inputs for parity only")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [rich_text(rng) for _ in range(args.distinct)]
+    fields = [rng.choice(pool) for _ in range(args.fields)]
+    fuzz = [fuzz_html(rng) for _ in range(args.fuzz)]
+
+    print(f"fields: {args.fields} ({args.distinct} distinct), fuzz inputs: {args.fuzz}")
+    mismatches = 0
+    for name, reference, fast in CHECKS:
+        hb_html._strings.cache_clear()
+        hb_html._text_and_tables.cache_clear()
+        expected, bs_s = _timed(reference, fields)
+        got, hb_s = _timed(fast, fields)
+        bad = [(v, e, g) for v, e, g in zip(fields + fuzz, expected + list(map(reference, fuzz)),
+                                            got + list(map(fast, fuzz))) if e != g]
+        mismatches += len(bad)
+        print(f"{name:32} bs4 {bs_s:6.2f}s  hb_html {hb_s:6.2f}s  {bs_s / hb_s:6.1f}x  mismatches: {len(bad)}")
+        for value, e, g in bad[:3]:
+            print(f"    input {value!r}\n    bs4   {e!r}\n    new   {g!r}")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
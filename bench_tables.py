@@ -0,0 +1,181 @@
+"""
+Benchmark and equivalence check: issue tables from the precompiled XML
+fragment vs the python-docx object path in Project_report, and mini tables
+(pasted HTML tables) from the cached width planner vs the per-cell code they
+replaced.
+
+    python bench_tables.py                # 3000 issue tables, 300 mini tables each way
+    python bench_tables.py --tables 500 --mini 50
+
+Both paths render the same field values (tabs, line breaks, markup
+characters, padding, non-ASCII, some nested mini tables) into the same report
+skeleton. Each document is then saved, and their word/document.xml must be
+byte-for-byte equal. The mini-table reference also writes its widths to the
+table grid, which the old code left evenly split.
+"""
+import argparse
+import io
+import random
+import time
+import zipfile
+
+from docx.shared import Inches, Pt
+
+import Project_report as report
+
+LABELS = ["Severity", "Description", "Implication", "Cost Impact",
+          "Management Comment 1", "Management Comment 2", "Recommendation"]
+WORDS = "cash till branch loan review control reconciliation overdue vault policy staff limit".split()
+ODD = ["a & b", "x < y > z", "\tindented", "line\nbreak", "cr\r\nlf", " padded ", "é ü 中文", "\"quoted\" 'single'",
+       "]]>", "", None, 0, 1234.5, " nbsp "]
+
+
+def make_issue(rng):
+    def value():
+        if rng.random() < 0.3:
+            return rng.choice(ODD)
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 40)))
+
+    fields = [(label, value()) for label in LABELS]
+    nested = {}
+    if rng.random() < 0.1:
+        nested["Description"] = [(["Item", "Amount"], [[rng.choice(WORDS), str(rng.randint(1, 999))] for _ in range(3)])]
+    return fields, nested
+
+
+# ─── Mini-table reference (per-cell widths) ─────────────────
+def reference_column_widths(text_matrix, max_total_width_inches=10.0, min_width_inches=0.5):
+    if not text_matrix:
+        return []
+    cols = list(zip(*text_matrix))
+    scores, total = [], 0.0
+    for col in cols:
+        lengths = [len(str(c)) for c in col]
+        mx = max(lengths)
+        has_sent = any(len(str(c).split()) > 5 for c in col)
+        is_num = all(str(c).replace(".", "", 1).isdigit() for c in col if c)
+        weight = 1.5 if has_sent else 0.5 if is_num else 1.0
+        scores.append(mx * weight)
+        total += mx * weight
+    total = total or 1.0
+    widths = [(s / total) * max_total_width_inches for s in scores]
+    widths = [max(min_width_inches, w) for w in widths]
+    used = sum(widths)
+    if used > max_total_width_inches:
+        factor = max_total_width_inches / used
+        widths = [w * factor for w in widths]
+    return [Inches(w) for w in widths]
+
+
+def reference_mini_table(cell, headers, rows):
+    col_count = max([len(headers)] + [len(r) for r in rows] + [0])
+    matrix = []
+    if headers:
+        matrix.append([headers[i] if i < len(headers) else "" for i in range(col_count)])
+    for r in rows:
+        matrix.append([r[i] if i < len(r) else "" for i in range(col_count)])
+    col_w = reference_column_widths(matrix, max_total_width_inches=cell.width.inches)
+
+    mini = cell.add_table(rows=1 if headers else 0, cols=col_count)
+    mini.autofit = False
+    mini.style = "Light Grid Accent 1"
+    for gridCol, width in zip(mini._tbl.tblGrid.gridCol_lst, col_w):
+        gridCol.w = width
+    if headers:
+        hdr_row = mini.rows[0].cells
+        for idx, txt in enumerate(matrix[0]):
+            hdr_row[idx].width = col_w[idx]
+            p = hdr_row[idx].paragraphs[0]
+            run = p.add_run(txt)
+            run.bold = True
+            p.paragraph_format.space_before = p.paragraph_format.space_after = Pt(0)
+    for row_vals in matrix[1 if headers else 0:]:
+        row_cells = mini.add_row().cells
+        for idx, txt in enumerate(row_vals):
+            row_cells[idx].width = col_w[idx]
+            p = row_cells[idx].paragraphs[0]
+            p.text = txt
+            p.paragraph_format.space_before = p.paragraph_format.space_after = Pt(0)
+            p.paragraph_format.line_spacing = 1.15
+    return mini
+
+
+def make_pasted_table(rng):
+    cols = rng.randint(1, 8)
+    headers = [rng.choice(WORDS).title() for _ in range(rng.randint(0, cols))]
+    rows = []
+    for _ in range(rng.randint(1, 120)):
+        row = []
+        for _ in range(rng.randint(1, cols)):
+            roll = rng.random()
+            row.append(str(rng.randint(0, 99999)) if roll < 0.3 else f"{rng.random() * 1000:.2f}" if roll < 0.4
+                       else rng.choice(ODD[:10]) if roll < 0.5 else " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))))
+        rows.append(row)
+    return headers, rows
+
+
+def render_mini(tables, add_table, repeat):
+    doc, _, _ = report._report_skeleton([[0, "P", "B", "North", "2024-05-01"]], "north")
+    cell = doc.add_table(rows=1, cols=2).rows[0].cells[1]
+    report._column_plan.cache_clear()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for headers, rows in tables:
+            add_table(cell, headers, rows)
+    elapsed = time.perf_counter() - started
+    buf = io.BytesIO()
+    doc.save(buf)
+    with zipfile.ZipFile(buf) as zf:
+        return zf.read("word/document.xml"), elapsed
+
+
+def render(issues, emit):
+    doc, _, _ = report._report_skeleton([[0, "P", "B", "North", "2024-05-01"]], "north")
+    started = time.perf_counter()
+    for fields, nested in issues:
+        emit(doc, fields, nested)
+    elapsed = time.perf_counter() - started
+    buf = io.BytesIO()
+    doc.save(buf)
+    with zipfile.ZipFile(buf) as zf:
+        return zf.read("word/document.xml"), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tables", type=int, default=3_000)
+    parser.add_argument("--mini", type=int, default=100, help="distinct pasted tables")
+    parser.add_argument("--repeat", type=int, default=3, help="times each pasted table is rendered")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    issues = [make_issue(rng) for _ in range(args.tables)]
+    pasted = [make_pasted_table(rng) for _ in range(args.mini)]
+
+    object_xml, object_s = render(issues, report._add_issue_table)
+    template_xml, template_s = render(issues, report._add_issue_table_fast)
+    ok = report_pair("issue tables", args.tables, "python-docx", object_s, object_xml, "fragment", template_s, template_xml)
+
+    n = args.mini * args.repeat
+    per_cell_xml, per_cell_s = render_mini(pasted, reference_mini_table, args.repeat)
+    planned_xml, planned_s = render_mini(pasted, report.add_mini_table_to_cell, args.repeat)
+    ok &= report_pair("mini tables", n, "per-cell", per_cell_s, per_cell_xml, "planned", planned_s, planned_xml)
+    raise SystemExit(0 if ok else 1)
+
+
+def report_pair(what, n, old_name, old_s, old_xml, new_name, new_s, new_xml):
+    print(f"{what}:  {n}")
+    print(f"  {old_name:12}  {old_s:8.2f}s  {n / old_s:10.0f} tables/s")
+    print(f"  {new_name:12}  {new_s:8.2f}s  {n / new_s:10.0f} tables/s")
+    print(f"  speed-up      {old_s / new_s:8.1f}x")
+    same = old_xml == new_xml
+    print(f"  document.xml  {'identical' if same else 'DIFFERENT'} ({len(old_xml)} bytes)")
+    if not same:
+        at = next(i for i, (a, b) in enumerate(zip(old_xml, new_xml)) if a != b)
+        print(f"    first difference at byte {at}:\n    {old_xml[at - 80:at + 80]!r}\n    {new_xml[at - 80:at + 80]!r}")
+    return same
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from docx.shared import RGBColor, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
+from hb_media import scaled_image
 #print(help(docx))
 
 
@@ -25,7 +26,7 @@ doc_para.add_run(' It includes various sections and formatting options.').bold =
 doc_para.add_run(' You can customize it as per your requirements.').italic = True
 
 #add image
-doc.add_picture('logo.jpg')
+doc.add_picture(scaled_image('logo.jpg'))
 
 #define a functio to add background color to cells
 def set_cell_background_color(cell, color_hex):
@@ -0,0 +1,379 @@
+"""
+asyncio HighBond API client.
+
+One aiohttp connection pool is shared by every request. Requests in flight and
+requests per second are governed by the process-wide limiter of hb_ratelimit.py
+(through an AsyncAdaptiveLimiter), the same one the requests sessions use. Its
+token bucket, in-flight window, Retry-After pause and AIMD state are shared by
+every client, whichever thread or event loop it runs in (run_sync opens a new
+loop per call), so the limits are global and a 429 pauses everyone. Pagination (`links.next`)
+is followed automatically.
+
+run_sync gives each call its own loop and connection pool. Sync code that makes
+many calls, possibly from several threads, can keep one client open on one
+background loop instead, and reuse its connections across calls:
+
+    with SyncClient(HighBondClient(host, headers)) as sync:
+        risks = sync.run(sync.client.fetch_many("risks", risk_ids))
+
+    async with HighBondClient(host, headers, url_for=_resource_url) as hb:
+        risks = await hb.fetch_many("risks", risk_ids)
+
+`host` is only used to resolve the relative `links.next` paths the API
+returns, so the client can be pointed at a local stub server that serves
+JSON:API pages.
+
+`fetch_compound` follows a JSON:API `include=` request and returns the
+related resources from `included` alongside the primary records.
+
+GETs go through the same on-disk response cache as the requests sessions
+(hb_cache.py, HIGHBOND_CACHE_MODE): fresh entries are served without touching
+the network or the limiter, stale ones are revalidated with If-None-Match /
+If-Modified-Since, and in offline mode a miss raises a 504 instead of
+sending anything.
+
+`fetch_batched` asks a collection endpoint for many ids at once with
+`filter[id]=a,b,c` and falls back to one request per id for resource types
+whose endpoint ignores or rejects the filter.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from hb_cache import CACHE_MODE, cache_key, shared_cache
+
+from hb_ratelimit import (
+    MAX_CONCURRENCY,
+    THROTTLE_STATUSES,
+    AdaptiveLimiter,
+    AsyncAdaptiveLimiter,
+    shared_limiter,
+)
+
+RETRY_STATUSES = {500, 502, 504} | THROTTLE_STATUSES
+BATCH_SIZE = int(os.getenv("HIGHBOND_BATCH_SIZE", "50"))  # ids per filter[id] request
+# statuses meaning "this endpoint doesn't take filter[id]"
+_UNSUPPORTED_FILTER_STATUSES = {400, 404, 405, 422}
+
+# Learned rate/concurrency targets: the process-wide limiter's controller
+shared_controller = shared_limiter().ctl
+
+# resource type -> whether its collection endpoint honours filter[id], learned per process
+batch_support = {}
+# [count] of the requests made on behalf of the fetch_batched call running in this task
+_call_requests = contextvars.ContextVar("hb_call_requests", default=None)
+
+
+def with_query(url, params):
+    """Append `params` to `url`, which may already carry a query string."""
+    if not params:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}{urlencode(params, safe='[],:')}"
+
+
+def without_include(url):
+    """`url` with its `include` query parameter removed, or None if it has none."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    kept = [(key, value) for key, value in query if key != "include"]
+    if len(kept) == len(query):
+        return None
+    return urlunsplit(parts._replace(query=urlencode(kept, safe="[],:")))
+
+
+class HighBondClient:
+    """Async JSON:API client; use as `async with HighBondClient(...) as hb:`."""
+
+    def __init__(
+        self,
+        host,
+        headers=None,
+        url_for=None,
+        batch_url_for=None,
+        limiter=None,
+        controller=None,
+        cache=None,
+        cache_mode=CACHE_MODE,
+        max_connections=MAX_CONCURRENCY,
+        timeout=30,
+        max_retries=5,
+        backoff_factor=1.0,
+    ):
+        self.host = host
+        self.headers = dict(headers or {})
+        self.url_for = url_for or (lambda resource_type, identifier: f"{host}/{resource_type}/{identifier}")
+        # resource_type -> collection URL accepting filter[id], or None
+        self.batch_url_for = batch_url_for or (lambda resource_type: None)
+        # an AdaptiveLimiter; `controller` alone gets a limiter of its own (benchmarks, stubs)
+        self.limiter = limiter or (AdaptiveLimiter(controller) if controller is not None else shared_limiter())
+        self.controller = self.limiter.ctl
+        self.cache_mode = cache_mode
+        self.cache = None if cache_mode == "off" else cache if cache is not None else shared_cache()
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.requests_made = 0
+        self.requests_saved = 0
+        self.cache_hits = 0
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._limiter = AsyncAdaptiveLimiter(self.limiter)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def get_json(self, url):
+        """
+        GET one page, through the response cache unless its mode is "off".
+        429/503 are retried once the limiter's shared Retry-After pause is
+        over; other 5xx are retried with exponential backoff.
+        """
+        if self.cache is None:
+            return json.loads(await self._get(url, {}) or b"null")
+
+        key = cache_key("GET", url)
+        entry = await asyncio.to_thread(self.cache.get, key)
+        if self.cache_mode == "offline":
+            if entry is None:
+                raise aiohttp.ClientResponseError(_request_info(url), (), status=504, message="Not Cached")
+            return self._cached(entry)
+        if entry is not None and time.time() - entry["stored_at"] < self.cache.ttl_for(url):
+            return self._cached(entry)
+
+        validators = {}
+        if entry is not None:
+            if entry["etag"]:
+                validators["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                validators["If-Modified-Since"] = entry["last_modified"]
+        body = await self._get(url, validators, key)
+        if body is None:  # 304: still what the cache holds
+            await asyncio.to_thread(self.cache.touch, key)
+            return self._cached(entry)
+        return json.loads(body or b"null")
+
+    def _cached(self, entry):
+        self.cache_hits += 1
+        return json.loads(entry["body"] or b"null")
+
+    async def _get(self, url, validators, key=None):
+        """Body of a 200 (stored in the cache under `key`), or None for a 304."""
+        for attempt in range(self.max_retries + 1):
+            async with self._limiter.slot() as outcome:
+                self.requests_made += 1
+                counter = _call_requests.get()
+                if counter is not None:
+                    counter[0] += 1
+                async with self._session.get(url, headers=validators) as resp:
+                    outcome.observe(resp.status, resp.headers)
+                    if resp.status not in RETRY_STATUSES or attempt == self.max_retries:
+                        if resp.status == 304 and validators:
+                            return None
+                        resp.raise_for_status()
+                        body = await resp.read()
+                        if key is not None and resp.status == 200:
+                            await asyncio.to_thread(self.cache.store, key, url, resp.status, dict(resp.headers), body)
+                        return body
+            if resp.status not in THROTTLE_STATUSES:
+                await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+
+    async def pages(self, url):
+        """Yield each page payload of `url`, following links.next."""
+        while url:
+            payload = await self.get_json(url)
+            yield payload
+            next_link = (payload.get("links") or {}).get("next")
+            url = urljoin(self.host, next_link) if next_link else None
+
+    async def fetch_all(self, url):
+        """All resource objects from every page of `url`."""
+        records = []
+        async for payload in self.pages(url):
+            data = payload.get("data")
+            if isinstance(data, list):
+                records.extend(data)
+            elif isinstance(data, dict):
+                records.append(data)
+        return records
+
+    async def fetch_compound(self, url):
+        """
+        Primary records from every page of `url` plus the `included` resources,
+        de-duplicated as {(type, id): resource}. A 400 for the include (the
+        JSON:API answer to an unsupported include path) retries without it,
+        returning no included resources.
+        """
+        records, included = [], {}
+        try:
+            async for payload in self.pages(url):
+                data = payload.get("data")
+                if isinstance(data, list):
+                    records.extend(data)
+                elif isinstance(data, dict):
+                    records.append(data)
+                for resource in payload.get("included") or []:
+                    included[(resource.get("type"), str(resource.get("id")))] = resource
+        except aiohttp.ClientResponseError as exc:
+            stripped = without_include(url)
+            if exc.status != 400 or stripped is None:
+                raise
+            return await self.fetch_all(stripped), {}
+        return records, included
+
+    async def fetch_many(self, resource_type, ids):
+        """
+        Fetch `url_for(resource_type, id)` for every id concurrently.
+        Returns the records flattened in the order of `ids`.
+        """
+        batches = await asyncio.gather(
+            *(self.fetch_all(self.url_for(resource_type, identifier)) for identifier in ids)
+        )
+        return [record for batch in batches for record in batch]
+
+    async def _fetch_chunk(self, resource_type, base_url, chunk, params=None):
+        """
+        Records for one chunk of ids via filter[id] (plus any extra filter
+        `params`), or None when the endpoint rejects the filter or answers with
+        ids that weren't asked for.
+        """
+        url = with_query(base_url, {**(params or {}), "filter[id]": ",".join(chunk), "page[size]": len(chunk)})
+        wanted = set(chunk)
+        records = []
+        try:
+            async for payload in self.pages(url):
+                data = payload.get("data")
+                data = data if isinstance(data, list) else [data] if isinstance(data, dict) else []
+                if any(str(record.get("id")) not in wanted for record in data):
+                    # filter silently ignored: this is the whole collection
+                    batch_support[resource_type] = False
+                    return None
+                records.extend(data)
+        except aiohttp.ClientResponseError as exc:
+            if exc.status not in _UNSUPPORTED_FILTER_STATUSES:
+                raise
+            batch_support[resource_type] = False
+            return None
+        batch_support[resource_type] = True
+        return records
+
+    async def fetch_batched(self, resource_type, ids, batch_size=BATCH_SIZE, params=None):
+        """
+        Like `fetch_many`, but `batch_size` ids per request through the
+        collection endpoint from `batch_url_for`. Ids the batched endpoint
+        doesn't return are treated as gone, as they are for a per-id 404.
+        Extra filter `params` (e.g. filter[updated_at][gte]) narrow the batched
+        requests; the per-id fallback can't apply them and returns every id.
+        `requests_saved` grows by the per-id requests this avoided.
+        """
+        requested = [str(identifier) for identifier in ids]
+        ids = list(dict.fromkeys(requested))
+        base_url = self.batch_url_for(resource_type)
+        if base_url is None or batch_support.get(resource_type) is False or len(ids) < 2:
+            return await self.fetch_many(resource_type, requested)
+
+        counter = [0]  # requests made for this call, whatever else shares the client
+        token = _call_requests.set(counter)
+        try:
+            chunks = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+            results = []
+            if batch_support.get(resource_type) is None:
+                # probe with one chunk so an unsupported endpoint costs one request, not one per chunk
+                results.append(await self._fetch_chunk(resource_type, base_url, chunks[0], params))
+                if results[0] is None:
+                    return await self.fetch_many(resource_type, requested)
+            results += await asyncio.gather(
+                *(self._fetch_chunk(resource_type, base_url, chunk, params) for chunk in chunks[len(results):])
+            )
+
+            found = {}
+            fallback = []
+            for chunk, records in zip(chunks, results):
+                if records is None:
+                    fallback.extend(chunk)
+                    continue
+                for record in records:
+                    found[str(record.get("id"))] = record
+            if fallback:
+                for record in await self.fetch_many(resource_type, fallback):
+                    found[str(record.get("id"))] = record
+        finally:
+            _call_requests.reset(token)
+        self.requests_saved += max(0, len(requested) - counter[0])
+        # one record per requested id, duplicates included, exactly as fetch_many returns them
+        return [found[identifier] for identifier in requested if identifier in found]
+
+
+def _request_info(url):
+    return aiohttp.RequestInfo(URL(url), "GET", CIMultiDictProxy(CIMultiDict()), URL(url))
+
+
+def run_sync(coro):
+    """Run `coro` to completion from sync code, even inside a notebook's running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class SyncClient:
+    """
+    An open HighBondClient on an event loop of its own (a daemon thread).
+    `run(coro)` may be called from any other thread; every call shares the
+    client's aiohttp session, so connections are reused across calls.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="hb-async-loop", daemon=True)
+        self._thread.start()
+        try:
+            self.run(client.__aenter__())
+        except BaseException:
+            self._stop()
+            raise
+
+    def run(self, coro):
+        """Run `coro` on the client's loop and wait for its result."""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("SyncClient.run called from its own event loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self.client.__aexit__(None, None, None))
+        finally:
+            self._stop()
+
+    def _stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,409 @@
+"""
+Attachment text extraction for the HighBond report scripts.
+
+Text comes from a registry of extractors chosen by what the bytes are, not by
+the URL suffix: magic bytes first, then the download's MIME type, then plain
+text. Extractors that match are tried in registration order, so a PDF is read
+from its text layer with PyMuPDF (installed with pdf2docx) and only falls back
+to the pdf2docx → DOCX → paragraphs conversion if that fails. DOCX text is
+read straight from word/document.xml in the zip.
+
+CPU-bound extractors run on a process pool, and anything that needs a file on
+disk works in its own temporary directory. Extracted text is kept in a local
+SQLite file keyed by attachment id and the SHA-256 of the content, so a given
+file is converted once across runs, even when it's attached to several issues.
+Attachments never change once uploaded, so `fetch` doesn't even download an
+attachment whose id is already in that cache. Downloads are streamed and
+refused past HIGHBOND_ATTACHMENT_MAX_MB (`read_capped`).
+
+    texts = AttachmentTexts()
+    for text, error in texts.map([Attachment(att_id, filename, content, mime_type), ...]):
+        ...
+    texts.fetch(attachment_ids, download)    # download(id) -> Attachment or None; (text, error) per id
+    texts.stats                              # downloaded, download_avoided, too_large, ...
+
+    register_extractor("rtf", rtf_text, sniff=is_rtf, mime_types=("application/rtf",))
+
+Settings: HIGHBOND_TEXT_CACHE_PATH (SQLite file), HIGHBOND_EXTRACT_WORKERS
+(processes, default min(4, cpu count)), HIGHBOND_ATTACHMENT_MAX_MB (default 25).
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree import ElementTree
+
+try:
+    import pymupdf
+except ImportError:  # older PyMuPDF releases only install the `fitz` name
+    try:
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+
+TEXT_CACHE_PATH = os.getenv("HIGHBOND_TEXT_CACHE_PATH", os.path.join(".hb_cache", "attachment_text.sqlite"))
+EXTRACT_WORKERS = int(os.getenv("HIGHBOND_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_ATTACHMENT_BYTES = int(os.getenv("HIGHBOND_ATTACHMENT_MAX_MB", "25")) * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    attachment_id TEXT NOT NULL,
+    sha256        TEXT NOT NULL,
+    name          TEXT NOT NULL,
+    text          TEXT NOT NULL,
+    stored_at     REAL NOT NULL,
+    PRIMARY KEY (attachment_id, sha256)
+);
+CREATE INDEX IF NOT EXISTS texts_sha256 ON texts (sha256);
+"""
+
+Attachment = namedtuple("Attachment", "id name data mime_type", defaults=(None,))
+Extractor = namedtuple("Extractor", "name func sniff mime_types cpu_bound")
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Run content python-docx's Paragraph.text renders as characters
+_DOCX_CHARS = {_W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+
+
+class AttachmentTooLarge(ValueError):
+    """An attachment body is bigger than the download cap."""
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_capped(resp, max_bytes=MAX_ATTACHMENT_BYTES, chunk_size=64 * 1024):
+    """
+    Body of a `stream=True` response, raising AttachmentTooLarge as soon as it
+    passes `max_bytes` (up front when Content-Length says so). Closes `resp`.
+    """
+    with resp:
+        declared = resp.headers.get("Content-Length", "")
+        if declared.isdigit() and int(declared) > max_bytes:
+            raise AttachmentTooLarge(f"{declared} bytes, cap is {max_bytes}")
+        body = bytearray()
+        for chunk in resp.iter_content(chunk_size):
+            body += chunk
+            if len(body) > max_bytes:
+                raise AttachmentTooLarge(f"over {max_bytes} bytes")
+        return bytes(body)
+
+
+# ─── Extractors (run in worker processes) ───────────────────
+def pdf_text(data):
+    """Text layer of a PDF via PyMuPDF, page by page, with no layout conversion."""
+    if pymupdf is None:
+        raise RuntimeError("PyMuPDF is not installed")
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+
+def pdf_text_via_docx(data):
+    """Paragraph text of a PDF, via a pdf2docx conversion in a private temp dir."""
+    from docx import Document
+    from pdf2docx import Converter
+
+    with tempfile.TemporaryDirectory(prefix="hb_attachment_") as tmp:
+        pdf_path = os.path.join(tmp, "attachment.pdf")
+        docx_path = os.path.join(tmp, "attachment.docx")
+        with open(pdf_path, "wb") as fh:
+            fh.write(data)
+        converter = Converter(pdf_path)
+        try:
+            converter.convert(docx_path, start=0, end=None)
+        finally:
+            converter.close()
+        return "\n".join(p.text for p in Document(docx_path).paragraphs)
+
+
+def docx_text(data):
+    """Paragraph text of a DOCX read from word/document.xml, table cells included."""
+    paragraphs, runs = [], []
+    with zipfile.ZipFile(io.BytesIO(data)) as zf, zf.open("word/document.xml") as xml:
+        for _, elem in ElementTree.iterparse(xml):
+            if elem.tag == _W + "t":
+                runs.append(elem.text or "")
+            elif elem.tag in _DOCX_CHARS:
+                runs.append(_DOCX_CHARS[elem.tag])
+            elif elem.tag == _W + "p":
+                paragraphs.append("".join(runs))
+                runs = []
+                elem.clear()
+    return "\n".join(paragraphs)
+
+
+def plain_text(data):
+    return data.decode("utf-8", errors="ignore")
+
+
+def is_pdf(data):
+    return data[:1024].lstrip().startswith(b"%PDF-")
+
+
+def is_docx(data):
+    if not data.startswith(b"PK\x03\x04"):
+        return False
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            return "word/document.xml" in zf.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+
+# ─── Registry ───────────────────────────────────────────────
+EXTRACTORS = []
+
+
+def register_extractor(name, func, sniff=None, mime_types=(), cpu_bound=False):
+    """
+    Add an extractor. `sniff(data)` recognises content by its bytes,
+    `mime_types` by the download's Content-Type. Extractors matching the same
+    content are tried in registration order until one succeeds. `cpu_bound`
+    ones run on the process pool, so `func` must be a module-level function.
+    """
+    EXTRACTORS.append(Extractor(name, func, sniff, frozenset(mime_types), cpu_bound))
+
+
+register_extractor("pdf", pdf_text, sniff=is_pdf, mime_types=("application/pdf",), cpu_bound=True)
+register_extractor("pdf2docx", pdf_text_via_docx, sniff=is_pdf, mime_types=("application/pdf",), cpu_bound=True)
+register_extractor("docx", docx_text, sniff=is_docx, mime_types=(DOCX_MIME,))
+
+
+def select_extractors(data, mime_type=None):
+    """Extractors for this content: by magic bytes, else by MIME type; [] means plain text."""
+    sniffed = [e for e in EXTRACTORS if e.sniff is not None and e.sniff(data)]
+    if sniffed:
+        return sniffed
+    mime = (mime_type or "").split(";")[0].strip().lower()
+    return [e for e in EXTRACTORS if mime in e.mime_types]
+
+
+def extract_text(data, mime_type=None):
+    """Plain text of one attachment body, from the first selected extractor that succeeds."""
+    error = None
+    for extractor in select_extractors(data, mime_type):
+        try:
+            return extractor.func(data)
+        except Exception as exc:
+            error = error or exc
+    if error is not None:
+        raise error
+    return plain_text(data)
+
+
+def is_cpu_bound(data, mime_type=None):
+    return any(e.cpu_bound for e in select_extractors(data, mime_type))
+
+
+# ─── Text cache ─────────────────────────────────────────────
+class TextCache:
+    """SQLite store of extracted attachment text, keyed by (attachment id, content hash)."""
+
+    def __init__(self, path=TEXT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def get(self, attachment_id, digest):
+        """Text for this content, preferring the row of the same attachment; None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM texts WHERE sha256 = ? ORDER BY attachment_id = ? DESC LIMIT 1",
+                (digest, str(attachment_id)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_by_id(self, attachment_id):
+        """Latest text stored for this attachment id, whatever its content hash; None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM texts WHERE attachment_id = ? ORDER BY stored_at DESC LIMIT 1",
+                (str(attachment_id),),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, attachment_id, digest, name, text):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO texts (attachment_id, sha256, name, text, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (str(attachment_id), digest, name, text, time.time()),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM texts")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_text_cache():
+    """Process-wide TextCache at TEXT_CACHE_PATH, opened on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TextCache()
+        return _shared_cache
+
+
+# ─── Batch extraction ───────────────────────────────────────
+class AttachmentTexts:
+    """
+    Extract text for batches of Attachment tuples.
+    Cache hits and cheap formats are handled inline; CPU-bound extractors run
+    on a process pool that is started on first use and reused for later batches.
+    """
+
+    def __init__(self, cache=None, max_workers=EXTRACT_WORKERS):
+        self.cache = cache if cache is not None else shared_text_cache()
+        self.max_workers = max_workers
+        self.stats = {
+            "extracted": 0, "cached": 0, "failed": 0,
+            "downloaded": 0, "download_avoided": 0, "too_large": 0,
+        }
+        self._stats_lock = threading.Lock()  # fetch() downloads on threads, and callers may share an instance
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def stats_snapshot(self):
+        """A consistent copy of `stats`."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def map(self, attachments):
+        """
+        (text, error) for each of `attachments`, in order. A file that can't be
+        converted gives (None, exception).
+        """
+        attachments = [Attachment(*att) for att in attachments]
+        texts = [(None, None)] * len(attachments)
+        futures = {}  # digest -> (future, [indexes]); each distinct content converts once
+        for index, att in enumerate(attachments):
+            digest = content_hash(att.data)
+            if digest in futures:
+                futures[digest][1].append(index)
+                continue
+            text = self.cache.get(att.id, digest)
+            if text is not None:
+                self._count("cached")
+                texts[index] = (text, None)
+                if self.cache.get_by_id(att.id) is None:  # same file under a new id: remember the id too
+                    self.cache.put(att.id, digest, att.name, text)
+            elif self.max_workers > 1 and is_cpu_bound(att.data, att.mime_type):
+                futures[digest] = (self._executor().submit(extract_text, att.data, att.mime_type), [index])
+            else:
+                texts[index] = self._convert(att, digest, lambda: extract_text(att.data, att.mime_type))
+
+        for digest, (future, indexes) in futures.items():
+            att = attachments[indexes[0]]
+            result = self._convert(att, digest, future.result, retry=lambda: extract_text(att.data, att.mime_type))
+            text = result[0]
+            for index in indexes:
+                texts[index] = result
+                if text is not None and index != indexes[0]:
+                    dup = attachments[index]
+                    self.cache.put(dup.id, digest, dup.name, text)
+        return texts
+
+    def fetch(self, attachment_ids, download, max_workers=8):
+        """
+        (text, error) for each of `attachment_ids`, in order. Ids already in the
+        text cache are not downloaded; the rest go through `download(id)` (an
+        Attachment, or None to skip) on a thread pool, then through `map`. A
+        skipped id gives (None, None), a failed one (None, exception).
+        """
+        texts = [(None, None)] * len(attachment_ids)
+        missing = []
+        for index, attachment_id in enumerate(attachment_ids):
+            text = self.cache.get_by_id(attachment_id)
+            if text is None:
+                missing.append(index)
+            else:
+                self._count("cached")
+                self._count("download_avoided")
+                texts[index] = (text, None)
+        if not missing:
+            return texts
+
+        def _download(attachment_id):
+            try:
+                att = download(attachment_id)
+            except AttachmentTooLarge as exc:
+                self._count("too_large")
+                return None, exc
+            except Exception as exc:
+                self._count("failed")
+                return None, exc
+            if att is not None:
+                self._count("downloaded")
+            return att, None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(missing), max_workers))) as pool:
+            downloaded = list(pool.map(_download, [attachment_ids[index] for index in missing]))
+        fetched = []
+        for index, (att, error) in zip(missing, downloaded):
+            if att is None:
+                texts[index] = (None, error)
+            else:
+                fetched.append((index, att))
+        for (index, _), result in zip(fetched, self.map(att for _, att in fetched)):
+            texts[index] = result
+        return texts
+
+    def skip(self, count):
+        """Record `count` attachments that were never needed, so never downloaded."""
+        self._count("download_avoided", count)
+
+    def _convert(self, att, digest, run, retry=None):
+        try:
+            try:
+                text = run()
+            except BrokenProcessPool:
+                self._pool = None  # a worker died; convert this one here, a new pool starts next batch
+                text = retry()
+        except Exception as exc:
+            self._count("failed")
+            return None, exc
+        self._count("extracted")
+        self.cache.put(att.id, digest, att.name, text)
+        return text, None
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,253 @@
+"""
+Persistent HTTP response cache for the HighBond API scripts.
+
+CachingAdapter is a drop-in replacement for requests' HTTPAdapter: mount it on
+a session and every GET is served from / stored in a local SQLite file. Only
+real network sends draw from the shared rate limiter (see hb_ratelimit.py).
+
+    cache = ResponseCache(".hb_cache/http_cache.sqlite")
+    session.mount("https://", CachingAdapter(cache, max_retries=retries))
+
+Modes (HIGHBOND_CACHE_MODE or the `mode` argument):
+  on       serve fresh entries, revalidate stale ones with If-None-Match /
+           If-Modified-Since, store new 200 responses (default)
+  offline  never touch the network; misses come back as 504, streamed GETs included
+  off      no caching, rate limiting only
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from hb_ratelimit import LimitedAdapter
+
+CACHE_PATH = os.getenv("HIGHBOND_CACHE_PATH", os.path.join(".hb_cache", "http_cache.sqlite"))
+CACHE_MODE = os.getenv("HIGHBOND_CACHE_MODE", "on").strip().lower()
+CACHE_MAX_BYTES = int(os.getenv("HIGHBOND_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Seconds an entry is served without revalidation, keyed by resource type
+DEFAULT_TTLS = {
+    "projects": 3600,
+    "issues": 3600,
+    "actions": 3600,
+    "planning_files": 3600,
+    "results_files": 3600,
+    "objectives": 3600,
+    "risks": 6 * 3600,
+    "controls": 6 * 3600,
+    "mitigations": 6 * 3600,
+    "walkthroughs": 6 * 3600,
+    "control_tests": 6 * 3600,
+    "compliance_regulations": 24 * 3600,
+    "compliance_requirements": 24 * 3600,
+    "compliance_mappings": 24 * 3600,
+    "attachments": 7 * 24 * 3600,
+    "content": 7 * 24 * 3600,  # attachment blobs never change once uploaded
+}
+DEFAULT_TTL = 3600
+
+# Headers that describe the wire encoding rather than the cached body
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+_ID_RE = re.compile(r"^(\d+|[0-9a-f\-]{32,36})$", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    status        INTEGER NOT NULL,
+    headers       TEXT NOT NULL,
+    body          BLOB NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    stored_at     REAL NOT NULL,
+    accessed_at   REAL NOT NULL,
+    size          INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+def resource_type(url):
+    """Last non-identifier path segment, e.g. /projects/12/issues → 'issues'."""
+    parts = [p for p in urlsplit(url).path.split("/") if p and not _ID_RE.match(p)]
+    return parts[-1] if parts else ""
+
+
+def cache_key(method, url):
+    """Cache key for a prepared request; `url` already carries the encoded params."""
+    return hashlib.sha256(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of GET responses with per-resource TTLs and LRU eviction."""
+
+    def __init__(self, path=CACHE_PATH, ttls=None, default_ttl=DEFAULT_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def ttl_for(self, url):
+        return self.ttls.get(resource_type(url), self.default_ttl)
+
+    def get(self, key):
+        """Return the stored entry as a dict (touching its LRU stamp), or None."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, etag, last_modified, stored_at "
+                "FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        url, status, headers, body, etag, last_modified, stored_at = row
+        return {
+            "url": url,
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": stored_at,
+        }
+
+    def put(self, key, url, resp):
+        """Store a 200 response body and its validators, then enforce the size cap."""
+        self.store(key, url, resp.status_code, resp.headers, resp.content)
+
+    def store(self, key, url, status, headers, body):
+        """`put` for a response that isn't a requests.Response (hb_async's aiohttp responses)."""
+        headers = CaseInsensitiveDict({k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS})
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, status, headers, body, etag, last_modified, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, url, status, json.dumps(dict(headers)), body,
+                    headers.get("ETag"), headers.get("Last-Modified"),
+                    now, now, len(body),
+                ),
+            )
+            self._evict()
+
+    def touch(self, key):
+        """Mark an entry fresh again after a 304 revalidation."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachingAdapter(LimitedAdapter):
+    """Rate-limited HTTPAdapter that answers GETs from a ResponseCache where it can."""
+
+    def __init__(self, cache, mode=CACHE_MODE, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.mode = mode
+
+    def send(self, request, stream=False, **kwargs):
+        if self.mode == "off" or request.method != "GET" or (stream and self.mode != "offline"):
+            # streamed bodies (attachment downloads) aren't buffered into the cache,
+            # but offline they still get a cached answer or the same 504 as any miss
+            return super().send(request, stream=stream, **kwargs)
+
+        key = cache_key(request.method, request.url)
+        entry = self.cache.get(key)
+
+        if self.mode == "offline":
+            if entry is None:
+                return self._build(request, {"status": 504, "headers": {}, "body": b""}, from_cache=False)
+            return self._build(request, entry)
+
+        if entry is not None and time.time() - entry["stored_at"] < self.cache.ttl_for(request.url):
+            return self._build(request, entry)
+
+        if entry is not None:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = super().send(request, stream=stream, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            resp.close()
+            self.cache.touch(key)
+            return self._build(request, entry)
+        if resp.status_code == 200:
+            self.cache.put(key, request.url, resp)
+        return resp
+
+    def _build(self, request, entry, from_cache=True):
+        resp = Response()
+        resp.status_code = entry["status"]
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = entry["body"]
+        resp._content_consumed = True
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        resp.reason = "OK" if resp.status_code == 200 else "Not Cached"
+        resp.from_cache = from_cache
+        return resp
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """Process-wide ResponseCache at CACHE_PATH, opened on first use."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
+
+
+def mount_cache(session, cache=None, mode=CACHE_MODE, **adapter_kwargs):
+    """Mount a CachingAdapter for http/https on `session` and return it."""
+    if cache is None and mode != "off":
+        cache = shared_cache()
+    adapter = CachingAdapter(cache, mode=mode, **adapter_kwargs) if mode != "off" else LimitedAdapter(**adapter_kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return adapter
@@ -0,0 +1,110 @@
+"""
+Chart rendering for the report scripts, off pyplot.
+
+pyplot keeps one global "current figure", so charts drawn through it cannot
+be rendered side by side. render_charts() draws each ChartSpec on its own
+matplotlib Figure with the Agg canvas. The work is spread over a process pool
+and the PNG bytes come back in order. They can go straight into
+InlineImage(tpl, io.BytesIO(png)) with no file in between. Output is cached on
+disk by a hash of the spec (data, labels, style, size, dpi) and the matplotlib
+version, so an unchanged chart is never drawn twice.
+
+    specs = [ChartSpec("bar", names, revenues, title="Revenue per Item", xlabel="Item", ylabel="Revenue")]
+    for png in render_charts(specs):
+        ...
+
+Charts are drawn at HIGHBOND_CHART_DPI (default 220, hb_media's target) rather
+than drawn large and scaled down later.
+
+Settings: HIGHBOND_CHART_CACHE (directory), HIGHBOND_CHART_DPI,
+HIGHBOND_CHART_WORKERS (processes, default min(4, cpu count)).
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+CHART_CACHE_DIR = os.getenv("HIGHBOND_CHART_CACHE", os.path.join(".hb_cache", "charts"))
+CHART_DPI = int(os.getenv("HIGHBOND_CHART_DPI", "220"))
+CHART_WORKERS = int(os.getenv("HIGHBOND_CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# kind is the Axes method that draws the data: "bar", "barh" or "plot"
+ChartSpec = namedtuple("ChartSpec", "kind labels values title xlabel ylabel figsize dpi color",
+                       defaults=("", "", "", (6.4, 4.8), CHART_DPI, None))
+
+_KINDS = {"bar", "barh", "plot"}
+
+
+def chart_key(spec):
+    """SHA-256 of everything that changes the PNG for `spec`."""
+    payload = json.dumps([matplotlib.__version__, spec.kind, list(spec.labels), list(spec.values),
+                          list(spec[3:])], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_png(spec):
+    """The PNG bytes for one ChartSpec, drawn on a figure of its own."""
+    if spec.kind not in _KINDS:
+        raise ValueError(f"Unsupported chart kind {spec.kind!r}; expected one of {sorted(_KINDS)}")
+    fig = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    options = {"color": spec.color} if spec.color else {}
+    getattr(ax, spec.kind)(list(spec.labels), list(spec.values), **options)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+    ax.set_title(spec.title)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=spec.dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def render_charts(specs, max_workers=CHART_WORKERS, cache_dir=CHART_CACHE_DIR):
+    """PNG bytes for every spec, in order; cache misses are drawn in a process pool."""
+    specs = list(specs)
+    keys = [chart_key(spec) for spec in specs]
+    pngs = [_cached(cache_dir, key) for key in keys]
+
+    # one drawing per distinct missing chart
+    missing = {}
+    for spec, key, png in zip(specs, keys, pngs):
+        if png is None:
+            missing.setdefault(key, spec)
+    if len(missing) > 1 and max_workers > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+            drawn = dict(zip(missing, pool.map(render_png, missing.values())))
+    else:
+        drawn = {key: render_png(spec) for key, spec in missing.items()}
+
+    for key, png in drawn.items():
+        _store(cache_dir, key, png)
+    return [png if png is not None else drawn[key] for key, png in zip(keys, pngs)]
+
+
+def _path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key + ".png")
+
+
+def _cached(cache_dir, key):
+    try:
+        with open(_path(cache_dir, key), "rb") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def _store(cache_dir, key, png):
+    target = _path(cache_dir, key)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # several report processes may fill the cache at once: write aside, then rename
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".png")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(png)
+    os.replace(tmp, target)
@@ -0,0 +1,153 @@
+"""
+Management-comment extraction for HighBond issues.
+
+`extract_comments` runs the fallback chain Project_report.py used to spread
+over several helpers, walking each issue once:
+
+1. the issue's custom attributes whose term looks like "Management Comment 1/2",
+   "Custom Field 1/2" or "Mgmt Comment 1/2";
+2. the same terms on the project (`term_comments(project_custom_attributes)`,
+   computed once per project and passed in);
+3. the first two distinct non-empty texts of description / effect / recommendation;
+4. the first "Management Comment 1: ..." / "... 2: ..." line anywhere in the issue.
+
+All patterns are compiled once at import, each family into a single matcher,
+and every HTML value is turned into text at most once per issue. Each comment
+comes back with the place it was found, e.g. "issue.custom_attributes[custom field 1]".
+
+    project = term_comments(project_attrs.get("custom_attributes"), "project")
+    cm1, cm2, source1, source2 = extract_comments(issue["attributes"], project)
+"""
+import re
+from collections import namedtuple
+
+from hb_html import html_to_text
+
+Comments = namedtuple("Comments", "cm1 cm2 source1 source2")
+NO_COMMENTS = Comments("", "", "", "")
+
+TEXT_FIELDS = ("description", "effect", "recommendation")
+
+_TERM_1 = r"management[\s_\-]*comments?[\s_\-]*1|custom[\s_\-]*fields?[\s_\-]*1|mgmt[\s_\-]*comments?[\s_\-]*1"
+_TERM_2 = r"management[\s_\-]*comments?[\s_\-]*2|custom[\s_\-]*fields?[\s_\-]*2|mgmt[\s_\-]*comments?[\s_\-]*2"
+# Both lookaheads always succeed, so one match() reports term 1 and term 2 independently
+TERM_MATCHER = re.compile(rf"(?=(?:.*?(?P<one>{_TERM_1}))?)(?=(?:.*?(?P<two>{_TERM_2}))?)", re.S)
+
+_COMMENT_1 = r"Comment\s*1[:\-–]?\s*(?P<one>.+)"
+_COMMENT_2 = r"Comment\s*2[:\-–]?\s*(?P<two>.+)"
+# First "… Comment 1: text" and first "… Comment 2: text" anywhere in a blob, even on one line
+COMMENT_MATCHER = re.compile(rf"(?=(?:[\s\S]*?{_COMMENT_1})?)(?=(?:[\s\S]*?{_COMMENT_2})?)", re.I)
+_HAS_COMMENT = re.compile(r"comment", re.I).search
+
+_SPACES_RE = re.compile(r"[ \t\u00A0]+")
+
+
+def clean_html(raw):
+    """Clean HTML, strip <p>, <br>, other tags, normalize spaces & remove leading/trailing junk."""
+    if not raw:
+        return ''
+    if isinstance(raw, list):
+        raw = "\n".join(map(str, raw))
+    elif not isinstance(raw, str):
+        raw = str(raw)
+    # <br> and the end of each <p> become newlines, entities are decoded (hb_html)
+    text = html_to_text(raw, separator='', strip=False, br='\n', p_break=True)
+    # Strip each line, collapse internal runs of spaces, drop empty lines
+    lines = (_SPACES_RE.sub(' ', line.strip()) for line in text.splitlines())
+    return '\n'.join(filter(None, lines)).strip()
+
+
+def comments_in_text(text):
+    """(comment 1, comment 2) written inline as "Management Comment 1: …" in `text`."""
+    m = COMMENT_MATCHER.match(text.strip())
+    one, two = m.group("one"), m.group("two")
+    return (one.strip() if one else ""), (two.strip() if two else "")
+
+
+def term_comments(custom_attributes, scope="issue"):
+    """
+    Comments held in custom attributes whose term names comment/field 1 or 2.
+    The first matching term wins; with duplicate terms the last value counts.
+    """
+    if not custom_attributes:
+        return NO_COMMENTS
+    by_term = {}
+    for attr in custom_attributes:
+        by_term[(attr.get("term") or "").strip().lower()] = attr.get("value", "")
+
+    raw = [None, None]
+    for term, value in by_term.items():
+        m = TERM_MATCHER.match(term)
+        for slot, group in enumerate(("one", "two")):
+            if raw[slot] is None and m.group(group):
+                raw[slot] = (term, value)
+        if raw[0] and raw[1]:
+            break
+
+    found = []
+    for hit in raw:
+        text = clean_html(hit[1]) if hit else ""
+        found.append((text, f"{scope}.custom_attributes[{hit[0]}]" if text else ""))
+    return Comments(found[0][0], found[1][0], found[0][1], found[1][1])
+
+
+def _walk_strings(obj, path):
+    """Yield (path, string) for every string nested in `obj`, depth first."""
+    if isinstance(obj, str):
+        yield path, obj
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from _walk_strings(value, f"{path}.{key}")
+    elif isinstance(obj, list):
+        for index, value in enumerate(obj):
+            yield from _walk_strings(value, f"{path}[{index}]")
+
+
+def extract_comments(attrs, project=NO_COMMENTS):
+    """
+    Management comments 1 and 2 of one issue (its `attributes` dict), with sources.
+    `project` is `term_comments(project custom attributes, "project")`.
+    """
+    cm = ["", ""]
+    src = ["", ""]
+
+    def _fill(slot, text, source):
+        if text and not cm[slot]:
+            cm[slot], src[slot] = text, source
+
+    # 1. issue custom attributes, 2. project custom attributes
+    for found in (term_comments(attrs.get("custom_attributes"), "issue"), project):
+        _fill(0, found.cm1, found.source1)
+        _fill(1, found.cm2, found.source2)
+        if cm[0] and cm[1]:
+            return Comments(cm[0], cm[1], src[0], src[1])
+
+    texts = {}  # each HTML value is converted at most once
+
+    def _text(value):
+        if value not in texts:
+            texts[value] = html_to_text(value)
+        return texts[value]
+
+    # 3. narrative fields: the first text is comment 1, the next different one comment 2
+    for field in TEXT_FIELDS:
+        value = attrs.get(field)
+        text = _text(value) if isinstance(value, str) else ""
+        if text:
+            if not cm[0]:
+                cm[0], src[0] = text, f"issue.{field}"
+            elif not cm[1] and text != cm[0]:
+                cm[1], src[1] = text, f"issue.{field}"
+        if cm[0] and cm[1]:
+            return Comments(cm[0], cm[1], src[0], src[1])
+
+    # 4. inline "Management Comment N:" anywhere in the issue
+    for path, value in _walk_strings(attrs, "issue"):
+        if not _HAS_COMMENT(value):
+            continue
+        one, two = comments_in_text(_text(value))
+        _fill(0, clean_html(one), path)
+        _fill(1, clean_html(two), path)
+        if cm[0] and cm[1]:
+            break
+    return Comments(cm[0], cm[1], src[0], src[1])
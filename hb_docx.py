@@ -0,0 +1,390 @@
+"""
+Streaming DOCX output for reports too large to hold as one python-docx tree.
+
+StreamingDocxWriter takes a python-docx Document that already holds the
+styles, page setup, cover page and the first content section's header and
+footer. It writes word/document.xml into the output zip as the body grows.
+The report code keeps using the python-docx API against that same Document.
+After each block (a project, say) `flush()` serializes the new body elements
+to the zip and detaches them, so memory stays flat however many issues there
+are.
+
+    with StreamingDocxWriter(doc, "report.docx") as writer:
+        for project in projects:
+            render_project(doc, section)          # plain python-docx calls
+            writer.flush()
+            writer.end_section(section)           # header/footer as they are now
+
+Every `end_section` closes a section that uses the body's last sectPr (page
+setup, numbering) plus its own copies of `section`'s current header and footer
+parts, like `doc.add_section` with unlinked headers/footers. The Document
+can't be saved normally afterwards. If the with-block raises, the partial file
+is deleted (`abort()`) rather than left behind as a truncated report.
+
+FragmentTemplate is the other half: a block built once through python-docx,
+serialized with placeholder runs, and afterwards filled by string formatting
+and parsed in one go (see Project_report issue tables).
+
+take_body_fragment / FragmentMerger move body content between Documents, e.g.
+from worker processes that each render part of a report:
+
+    fragment = take_body_fragment(scratch_doc)    # picklable; scratch body left empty
+    FragmentMerger(doc).add(fragment)             # appended to doc's body, ids renumbered
+
+Relationships the fragment uses (images, hyperlinks, other parts) are re-created
+in the target and its r:id/r:embed values rewritten; images go through
+python-docx's image dedup, and drawing ids (wp:docPr) get fresh values.
+Style and numbering ids are copied as they are, so both documents must start
+from the same template.
+"""
+import io
+import os
+import posixpath
+import re
+import zipfile
+from collections import namedtuple
+from copy import deepcopy
+from xml.sax.saxutils import escape
+
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.part import Part
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsmap, qn
+from lxml import etree
+
+_BODY_MARK = "hb-docx-body"
+_NS_DECL_RE = re.compile(r' xmlns:(\w+)="([^"]*)"')
+_PART_NUMBER_RE = re.compile(r"^word/(?:header|footer)(\d+)\.xml$")
+_PKG_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+_R_ATTR = "{%s}" % nsmap["r"]
+_DOC_PR = qn("wp:docPr")
+_R_ID = qn("r:id")
+# r:ids of the header/footer references in a sectPr, and in a body paragraph's section break
+_HDRFTR_RIDS = etree.XPath("w:headerReference/@r:id|w:footerReference/@r:id", namespaces=nsmap)
+_BREAK_HDRFTR_RIDS = etree.XPath("w:pPr/w:sectPr/w:headerReference/@r:id|w:pPr/w:sectPr/w:footerReference/@r:id",
+                                 namespaces=nsmap)
+_PART_INDEX_RE = re.compile(r"\d*(\.\w+)$")
+_RUN_SPLIT_RE = re.compile(r"([\t\r\n])")
+# what lxml refuses in text nodes ("All strings must be XML compatible")
+_XML_INCOMPATIBLE_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+def strip_ns_decls(xml, nsmap):
+    """Drop the namespace declarations on a fragment's first tag that the document root already makes."""
+    end = xml.index(">")
+    head = _NS_DECL_RE.sub(lambda m: "" if nsmap.get(m.group(1)) == m.group(2) else m.group(0), xml[:end])
+    return head + xml[end:]
+
+
+def run_content_xml(text):
+    """The <w:t>/<w:tab/>/<w:br/> children python-docx writes for `run.text = text`."""
+    if _XML_INCOMPATIBLE_RE.search(text):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    out = []
+    for piece in _RUN_SPLIT_RE.split(text):
+        if piece == "\t":
+            out.append("<w:tab/>")
+        elif piece in ("\r", "\n"):
+            out.append("<w:br/>")
+        elif piece:
+            space = ' xml:space="preserve"' if len(piece.strip()) < len(piece) else ""
+            out.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    return "".join(out)
+
+
+class FragmentTemplate:
+    """
+    An element serialized once with text slots. `element` is built the normal
+    way with each slot's run holding just its slot name, e.g. add_run("SLOT0");
+    render(*texts) swaps the run contents in by string formatting and parses the
+    result, giving the element python-docx would have built for those texts.
+    Only the w: namespace is declared on the fragment, as on python-docx's own
+    new elements.
+    """
+
+    def __init__(self, element, slots):
+        other_ns = {prefix: uri for prefix, uri in element.nsmap.items() if prefix and prefix != "w"}
+        xml = strip_ns_decls(etree.tostring(element, encoding=str), other_ns)
+        self.pieces = []
+        for slot in slots:
+            head, xml = xml.split(f"<w:t>{slot}</w:t>", 1)
+            self.pieces.append(head)
+        self.pieces.append(xml)
+
+    def render(self, *texts):
+        out = [self.pieces[0]]
+        for text, piece in zip(texts, self.pieces[1:]):
+            out.append(run_content_xml(text))
+            out.append(piece)
+        return parse_xml("".join(out))
+
+
+# serialized body elements, and {rId: (reltype, target_ref, is_external, content_type, partname, blob)}
+Fragment = namedtuple("Fragment", "xml rels")
+
+
+def rel_ids(element):
+    """The relationship ids (r:id, r:embed, ...) used anywhere in `element`."""
+    return {value for node in element.iter() for name, value in node.attrib.items() if name.startswith(_R_ATTR)}
+
+
+def take_body_fragment(doc):
+    """Serialize and detach `doc`'s body content (all but the final sectPr), with the relationships it uses."""
+    body = doc.element.body
+    sentinel = body.sectPr
+    xml, rids = [], set()
+    for child in list(body):
+        if child is sentinel:
+            continue
+        rids |= rel_ids(child)
+        xml.append(etree.tostring(child, encoding=str))
+        body.remove(child)
+    rels = {}
+    for rid in rids:
+        rel = doc.part.rels[rid]
+        if rel.is_external:
+            rels[rid] = (rel.reltype, rel.target_ref, True, None, None, None)
+        else:
+            part = rel.target_part
+            rels[rid] = (rel.reltype, None, False, part.content_type, str(part.partname), part.blob)
+    return Fragment(xml, rels)
+
+
+class FragmentMerger:
+    """Append Fragments taken from other Documents to `doc`'s body, in order; see module docstring."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.body = doc.element.body
+        self._next_id = None
+
+    def add(self, fragment):
+        rid_map = {rid: self._relate(*rel) for rid, rel in fragment.rels.items()}
+        sentinel = self.body.sectPr
+        for xml in fragment.xml:
+            element = parse_xml(xml)
+            if rid_map or "docPr" in xml:
+                self._renumber(element, rid_map)
+            if sentinel is not None:
+                sentinel.addprevious(element)
+            else:
+                self.body.append(element)
+
+    def _renumber(self, element, rid_map):
+        for node in element.iter():
+            for name, value in node.attrib.items():
+                if name.startswith(_R_ATTR) and value in rid_map:
+                    node.set(name, rid_map[value])
+            if node.tag == _DOC_PR:
+                if self._next_id is None:
+                    self._next_id = self.doc.part.next_id
+                node.set("id", str(self._next_id))
+                self._next_id += 1
+
+    def _relate(self, reltype, target_ref, is_external, content_type, partname, blob):
+        part = self.doc.part
+        if is_external:
+            return part.relate_to(target_ref, reltype, is_external=True)
+        if reltype == RT.IMAGE:
+            return part.get_or_add_image(io.BytesIO(blob))[0]
+        package = part.package
+        new_part = Part(package.next_partname(_PART_INDEX_RE.sub(r"%d\1", partname)), content_type, blob, package)
+        return part.relate_to(new_part, reltype)
+
+
+class StreamingDocxWriter:
+    """Write a python-docx Document's body to `path` incrementally; see module docstring."""
+
+    def __init__(self, doc, path, compression=zipfile.ZIP_DEFLATED):
+        self.doc = doc
+        self.path = path
+        self.body = doc.element.body
+        self.nsmap = {k: v for k, v in doc.element.nsmap.items() if k}
+        self._sentinel = self.body.sectPr  # page setup every streamed section starts from
+        self._pending_sectPr = None
+        self._section_rids = set()  # header/footer rIds used by the sectPrs streamed so far
+        self._parts = []  # (partname, content type, reltype, rId, blob)
+        self._next_part = self._first_free_part_number()
+        self._next_rid = 1
+        self._zip = zipfile.ZipFile(path, "w", compression)
+        self._doc_stream = self._zip.open("word/document.xml", "w", force_zip64=True)
+        self._write_prologue()
+        self.flush()
+
+    # ── document.xml ──
+    def _write_prologue(self):
+        # serialize the root with a marker in place of the body content to get the exact start tags
+        children = list(self.body)
+        for child in children:
+            self.body.remove(child)
+        self.body.append(etree.Comment(_BODY_MARK))
+        xml = etree.tostring(self.doc.element, encoding="UTF-8", xml_declaration=True, standalone=True)
+        self.body.remove(self.body[-1])
+        for child in children:
+            self.body.append(child)
+        head, self._epilogue = xml.split(f"<!--{_BODY_MARK}-->".encode("utf-8"))
+        self._doc_stream.write(head)
+
+    def _write(self, xml):
+        self._doc_stream.write(strip_ns_decls(xml, self.nsmap).encode("utf-8"))
+
+    def flush(self):
+        """Write every body element added since the last flush, then detach them."""
+        for child in list(self.body):
+            if child is self._sentinel:
+                continue
+            if self._pending_sectPr is not None:
+                # the previous section ends right before the next content starts
+                self._write(etree.tostring(self._section_break(self._pending_sectPr), encoding=str))
+                self._pending_sectPr = None
+            # cover-page section breaks may point at the base document's headers/footers
+            self._section_rids.update(_BREAK_HDRFTR_RIDS(child))
+            self._write(etree.tostring(child, encoding=str))
+            self.body.remove(child)
+
+    def end_section(self, section):
+        """Close the section streamed so far, with copies of `section`'s header and footer."""
+        self.flush()
+        sectPr = deepcopy(self._sentinel)
+        for ref in sectPr.xpath("w:headerReference|w:footerReference"):
+            sectPr.remove(ref)
+        refs = []
+        if section.header._has_definition:
+            refs.append(("w:headerReference", self._add_hdrftr("header", section.header.part.blob)))
+        if section.footer._has_definition:
+            refs.append(("w:footerReference", self._add_hdrftr("footer", section.footer.part.blob)))
+        for index, (tag, rid) in enumerate(refs):
+            ref = OxmlElement(tag)
+            ref.set(qn("w:type"), "default")
+            ref.set(_R_ID, rid)
+            sectPr.insert(index, ref)
+        self._pending_sectPr = sectPr
+
+    def _section_break(self, sectPr):
+        p = OxmlElement("w:p")
+        pPr = OxmlElement("w:pPr")
+        pPr.append(sectPr)
+        p.append(pPr)
+        return p
+
+    # ── extra parts ──
+    def _first_free_part_number(self):
+        used = [0]
+        for part in self.doc.part.package.iter_parts():
+            m = _PART_NUMBER_RE.match(part.partname.lstrip("/"))
+            if m:
+                used.append(int(m.group(1)))
+        return max(used) + 1
+
+    def _add_hdrftr(self, kind, blob):
+        partname = f"word/{kind}{self._next_part}.xml"
+        self._next_part += 1
+        content_type = CT.WML_HEADER if kind == "header" else CT.WML_FOOTER
+        reltype = RT.HEADER if kind == "header" else RT.FOOTER
+        return self.add_part(partname, content_type, reltype, blob)
+
+    def add_part(self, partname, content_type, reltype, blob):
+        """Add a part related to the main document; returns its relationship id."""
+        rid = f"rIdS{self._next_rid}"
+        self._next_rid += 1
+        self._parts.append((partname, content_type, reltype, rid, blob))
+        return rid
+
+    # ── package ──
+    def close(self):
+        """Finish document.xml and write the rest of the package around it."""
+        if self._zip is None:
+            return
+        self.flush()
+        final = self._pending_sectPr if self._pending_sectPr is not None else self._sentinel
+        self._write(etree.tostring(final, encoding=str))
+        self._doc_stream.write(self._epilogue)
+        self._doc_stream.close()
+
+        # once a section has been ended, the sentinel's own header/footer are referenced nowhere
+        dropped_rids = set()
+        if final is not self._sentinel:
+            dropped_rids = set(_HDRFTR_RIDS(self._sentinel)) - self._section_rids
+
+        # everything else comes from the base document as python-docx would save it
+        base = io.BytesIO()
+        self.doc.save(base)
+        doc_rels = "word/_rels/document.xml.rels"
+        with zipfile.ZipFile(base) as src:
+            items = {item.filename: item for item in src.infolist()}
+            data = {name: src.read(name) for name in items if name != "word/document.xml"}
+        data[doc_rels] = self._patched_rels(data[doc_rels], dropped_rids)
+        kept = _reachable_parts(data)
+        data["[Content_Types].xml"] = self._patched_content_types(data["[Content_Types].xml"], kept)
+        for name, item in items.items():
+            if name in data and (name in kept or name == "[Content_Types].xml"):
+                self._zip.writestr(item, data[name])
+        for partname, _, _, _, blob in self._parts:
+            self._zip.writestr(partname, blob)
+        self._zip.close()
+        self._zip = None
+
+    def abort(self):
+        """Stop writing and delete the partial file, so no truncated report is left at `path`."""
+        if self._zip is None:
+            return
+        self._doc_stream.close()
+        self._zip.close()
+        self._zip = None
+        os.remove(self.path)
+
+    def _patched_rels(self, data, dropped_rids=()):
+        root = etree.fromstring(data)
+        for rel in list(root):
+            if rel.get("Id") in dropped_rids:
+                root.remove(rel)
+        for partname, _, reltype, rid, _ in self._parts:
+            rel = etree.SubElement(root, f"{{{_PKG_RELS}}}Relationship")
+            rel.set("Id", rid)
+            rel.set("Type", reltype)
+            rel.set("Target", posixpath.relpath(partname, "word"))
+        return etree.tostring(root, encoding="UTF-8", xml_declaration=True, standalone=True)
+
+    def _patched_content_types(self, data, kept):
+        root = etree.fromstring(data)
+        for override in root.findall(f"{{{_CT_NS}}}Override"):
+            if override.get("PartName").lstrip("/") not in kept:
+                root.remove(override)
+        for partname, content_type, _, _, _ in self._parts:
+            override = etree.SubElement(root, f"{{{_CT_NS}}}Override")
+            override.set("PartName", "/" + partname)
+            override.set("ContentType", content_type)
+        return etree.tostring(root, encoding="UTF-8", xml_declaration=True, standalone=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _reachable_parts(files):
+    """Names in `files` (zip name -> bytes) reachable through relationships from the package root, .rels included."""
+    kept = set()
+    pending = [""]
+    while pending:
+        source = pending.pop()
+        folder, name = posixpath.split(source)
+        rels = posixpath.join(folder, "_rels", name + ".rels")
+        if rels not in files:
+            continue
+        kept.add(rels)
+        for rel in etree.fromstring(files[rels]):
+            target = rel.get("Target")
+            if rel.get("TargetMode") == "External":
+                continue
+            target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+            if target not in kept:
+                kept.add(target)
+                pending.append(target)
+    return kept
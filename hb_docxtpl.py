@@ -0,0 +1,397 @@
+"""
+Batch rendering for docxtpl templates (Report_templates/*.docx).
+
+DocxTemplate.render() reloads the .docx, re-patches the XML and recompiles the
+Jinja source for every context. CompiledTemplate does that once: the
+template's untouched zip entries are compressed once and copied as they are, each templated part (body,
+headers/footers with tags, footnotes) is patched and compiled once, and a
+render regenerates only those parts, plus whatever media and relationships the
+context adds (InlineImage, hyperlinks).
+
+    tpl = CompiledTemplate("Report_templates/inviteTmpl.docx")
+    tpl.save(context, "invite.docx")
+
+    jobs = ((ctx, f"output/invite_{i}.docx") for i, ctx in enumerate(contexts))
+    for path in render_batch("Report_templates/inviteTmpl.docx", jobs):
+        ...
+
+save_merged(contexts, path) writes one document with the body repeated per
+context, separated by page breaks; media shared between contexts is stored
+once.
+
+render_batch spreads the renders over a process pool, one compiled template
+per worker. Contexts have to pickle, so put BatchImage(path, width, height)
+where a script would put InlineImage(tpl, path, ...); it is bound to the
+worker's template. Subdocs (tpl.new_subdoc()) are not supported.
+
+    python hb_docxtpl.py Report_templates/dynamic_table_tpl.docx contexts.jsonl -o output/
+
+Settings: HIGHBOND_TPL_WORKERS (processes for render_batch).
+"""
+import argparse
+import io
+import json
+import os
+import posixpath
+import re
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml.parser import parse_xml
+from docx.oxml.shape import CT_Inline
+from docxtpl import DocxTemplate, InlineImage
+from jinja2 import Environment
+from jinja2.exceptions import TemplateError
+from lxml import etree
+
+from hb_docx import rel_ids
+
+RENDER_WORKERS = int(os.getenv("HIGHBOND_TPL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# docx.core_properties fields DocxTemplate.render_properties() runs through Jinja
+CORE_PROPERTIES = ("author", "comments", "identifier", "language", "subject", "title")
+FOOTNOTES_CT = "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"
+
+_JINJA_RE = re.compile(r"\{[\{%#]")
+_PARAGRAPH_RE = re.compile(r"<w:p([ >])")
+_NL_PARAGRAPH_RE = re.compile(r"\n<w:p([ >])")
+_TAG_RE = re.compile(r"<[^>]+>")
+_PKG_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+_EMPTY_RELS = f'<Relationships xmlns="{_PKG_RELS}"/>'.encode()
+# media that deflate cannot shrink: written stored rather than compressed again for every document
+_PACKED_MEDIA = {".png", ".jpg", ".jpeg", ".gif"}
+_PAGE_BREAK = f'<w:p {nsdecls("w")}><w:r><w:br w:type="page"/></w:r></w:p>'
+
+BatchImage = namedtuple("BatchImage", "image_descriptor width height anchor", defaults=(None, None, None))
+
+# one templated part: zip entry name, python-docx part, compiled template, patched source,
+# "body" / "xml" (whole part, re-serialized) / "raw" (whole part, written as rendered), rIds in the template
+_TemplatedPart = namedtuple("_TemplatedPart", "zipname part template source kind base_rids")
+
+
+def _zipname(part):
+    return part.partname.lstrip("/")
+
+
+def _rels_name(zipname):
+    folder, name = posixpath.split(zipname)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+class CompiledTemplate:
+    """A docxtpl template parsed and compiled once, rendered any number of times; see module docstring."""
+
+    def __init__(self, template_file, jinja_env=None, autoescape=False):
+        if hasattr(template_file, "read"):
+            data = template_file.read()
+        else:
+            with open(template_file, "rb") as fh:
+                data = fh.read()
+        self.jinja_env = jinja_env or Environment()
+        if autoescape:
+            self.jinja_env.autoescape = autoescape
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.entries = [(info, zf.read(info.filename)) for info in zf.infolist()]
+        self._raw = {info.filename: blob for info, blob in self.entries}
+
+        # the DocxTemplate stays loaded: InlineImage, RichText links and listings render against it
+        self.tpl = DocxTemplate(io.BytesIO(data))
+        self.tpl.render_init()
+        docx = self.tpl.docx
+
+        self.parts = [self._compile(docx.part, self.tpl.patch_xml(self.tpl.get_xml()), "body")]
+        for uri in (DocxTemplate.HEADER_URI, DocxTemplate.FOOTER_URI):
+            for _, part in self.tpl.get_headers_footers(uri):
+                xml = self.tpl.patch_xml(self.tpl.get_part_xml(part))
+                if _JINJA_RE.search(xml):
+                    self.parts.append(self._compile(part, xml, "xml"))
+        for part in docx.part.package.parts:
+            if part.content_type == FOOTNOTES_CT:
+                xml = self.tpl.patch_xml(part.blob.decode("utf-8") if isinstance(part.blob, bytes) else part.blob)
+                if _JINJA_RE.search(xml):
+                    self.parts.append(self._compile(part, xml, "raw"))
+
+        core = docx.core_properties
+        self.properties = {
+            prop: self.jinja_env.from_string(getattr(core, prop))
+            for prop in CORE_PROPERTIES if _JINJA_RE.search(getattr(core, prop) or "")
+        }
+
+        # entries no render can touch, deflated once; save() appends the rest to a copy
+        volatile = {"[Content_Types].xml", _zipname(docx.part.package._core_properties_part)}
+        for tp in self.parts:
+            volatile |= {tp.zipname, _rels_name(tp.zipname)}
+        self._volatile = [(info, blob) for info, blob in self.entries if info.filename in volatile]
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for info, blob in self.entries:
+                if info.filename not in volatile:
+                    zf.writestr(info, blob)
+        self._base = buf.getvalue()
+
+        types = etree.fromstring(self._raw["[Content_Types].xml"])
+        self._default_types = {el.get("Extension").lower() for el in types.iter(f"{{{_CT_NS}}}Default")}
+        self._image_parts = {}
+
+    def _compile(self, part, patched_xml, kind):
+        source = _PARAGRAPH_RE.sub(r"\n<w:p\1", patched_xml)
+        return _TemplatedPart(_zipname(part), part, self.jinja_env.from_string(source), source, kind, frozenset(part.rels))
+
+    # ── rendering ──
+    def bind(self, value):
+        """`value` with BatchImage (and other templates' InlineImage) bound to this template."""
+        if isinstance(value, BatchImage):
+            return _BoundImage(self, *value)
+        if isinstance(value, InlineImage):
+            return _BoundImage(self, value.image_descriptor, value.width, value.height, value.anchor)
+        if isinstance(value, dict):
+            return {key: self.bind(item) for key, item in value.items()}
+        if type(value) in (list, tuple):
+            return type(value)(self.bind(item) for item in value)
+        return value
+
+    def _render_xml(self, tp, context):
+        # DocxTemplate.render_xml_part with the compile step already done
+        self.tpl.current_rendering_part = tp.part
+        try:
+            xml = tp.template.render(context)
+        except TemplateError as exc:
+            if getattr(exc, "lineno", None) is not None:
+                line_number = max(exc.lineno - 4, 0)
+                exc.docx_context = [_TAG_RE.sub("", x) for x in tp.source.splitlines()[line_number:line_number + 7]]
+            raise
+        xml = _NL_PARAGRAPH_RE.sub(r"<w:p\1", xml)
+        xml = xml.replace("{_{", "{{").replace("}_}", "}}").replace("{_%", "{%").replace("%_}", "%}")
+        return self.tpl.resolve_listing(xml)
+
+    def image_part(self, image_descriptor):
+        """
+        The package's image part for `image_descriptor`. A file path is read and
+        hashed the first time only; python-docx would re-read it and re-hash every
+        image in the package for each InlineImage.
+        """
+        if not isinstance(image_descriptor, (str, os.PathLike)):
+            return self.tpl.docx.part.package.get_or_add_image_part(image_descriptor)
+        key = os.fspath(image_descriptor)
+        if key not in self._image_parts:
+            self._image_parts[key] = self.tpl.docx.part.package.get_or_add_image_part(key)
+        return self._image_parts[key]
+
+    def render(self, context):
+        """{zip entry name: bytes} for every entry that differs from the template for `context`."""
+        try:
+            return self._render(self.bind(context))
+        finally:
+            self._drop_added_rels()
+
+    def render_merged(self, contexts, page_break=True):
+        """
+        Like render(), for one document holding the body rendered once per
+        context, each after a page break. Headers, footers and properties are
+        rendered with the first context. Media shared between contexts is
+        stored once.
+        """
+        body = first = None
+        try:
+            for context in contexts:
+                context = self.bind(context)
+                element = self.tpl.fix_tables(self._render_xml(self.parts[0], context))
+                if body is None:
+                    body, first = element, context
+                    sect_pr = body.find(qn("w:sectPr"))
+                    continue
+                if page_break:
+                    _insert_before(body, parse_xml(_PAGE_BREAK), sect_pr)
+                for child in element:
+                    if child.tag != qn("w:sectPr"):
+                        _insert_before(body, child, sect_pr)
+            if body is None:
+                raise ValueError("render_merged() needs at least one context")
+            return self._render(first, body)
+        finally:
+            self._drop_added_rels()
+
+    def _render(self, context, body=None):
+        out, new_types = {}, {}
+        for tp in self.parts:
+            if tp.kind == "body":
+                element = body if body is not None else self.tpl.fix_tables(self._render_xml(tp, context))
+                self.tpl.docx_ids_index = 1000
+                self.tpl.fix_docpr_ids(element)
+                # serialized in place of the template body, as DocxTemplate does, then put back:
+                # new_pic_inline numbers pictures from the ids in the live tree
+                root = self.tpl.docx.element
+                template_body = root.body
+                root.replace(template_body, element)
+                out[tp.zipname] = serialize_part_xml(root)
+                root.replace(element, template_body)
+            else:
+                blob = self._render_xml(tp, context).encode("utf-8")
+                element = parse_xml(blob)
+                out[tp.zipname] = serialize_part_xml(element) if tp.kind == "xml" else blob
+            self._add_rels(tp, element, out, new_types)
+
+        if self.properties:
+            core = self.tpl.docx.core_properties
+            for prop, template in self.properties.items():
+                setattr(core, prop, template.render(context))
+            core_part = self.tpl.docx.part.package._core_properties_part
+            out[_zipname(core_part)] = core_part.blob
+        if new_types:
+            out["[Content_Types].xml"] = self._content_types(new_types)
+        return out
+
+    def _drop_added_rels(self):
+        # the next document numbers its rIds from the template again; image parts stay cached
+        for tp in self.parts:
+            for rid in set(tp.part.rels) - tp.base_rids:
+                del tp.part.rels[rid]
+
+    def _add_rels(self, tp, element, out, new_types):
+        """Relationships the render added to `tp`'s part (images, links), with the parts they point at."""
+        added = sorted(rid for rid in rel_ids(element) if rid not in tp.base_rids and rid in tp.part.rels)
+        if not added:
+            return
+        rels_name = _rels_name(tp.zipname)
+        root = etree.fromstring(self._raw.get(rels_name, _EMPTY_RELS))
+        for rid in added:
+            rel = tp.part.rels[rid]
+            node = etree.SubElement(root, f"{{{_PKG_RELS}}}Relationship", Id=rid, Type=rel.reltype, Target=rel.target_ref)
+            if rel.is_external:
+                node.set("TargetMode", "External")
+                continue
+            name = _zipname(rel.target_part)
+            if name not in self._raw:
+                out[name] = rel.target_part.blob
+                new_types[name] = rel.target_part.content_type
+        out[rels_name] = etree.tostring(root, encoding="UTF-8", xml_declaration=True, standalone=True)
+
+    def _content_types(self, new_types):
+        root = etree.fromstring(self._raw["[Content_Types].xml"])
+        for name, content_type in sorted(new_types.items()):
+            if posixpath.splitext(name)[1][1:].lower() not in self._default_types:
+                etree.SubElement(root, f"{{{_CT_NS}}}Override", PartName="/" + name, ContentType=content_type)
+        return etree.tostring(root, encoding="UTF-8", xml_declaration=True, standalone=True)
+
+    def save(self, context, path):
+        """Render `context` and write the .docx to `path` (a filename or binary file); returns `path`."""
+        return self._write(self.render(context), path)
+
+    def save_merged(self, contexts, path, page_break=True):
+        """render_merged() written to `path`; returns `path`."""
+        return self._write(self.render_merged(contexts, page_break), path)
+
+    def _write(self, changed, path):
+        buf = io.BytesIO(self._base)
+        with zipfile.ZipFile(buf, "a", zipfile.ZIP_DEFLATED) as zf:
+            for info, blob in self._volatile:
+                zf.writestr(info, changed.pop(info.filename, blob))
+            for name, blob in changed.items():
+                packed = posixpath.splitext(name)[1].lower() in _PACKED_MEDIA
+                zf.writestr(name, blob, zipfile.ZIP_STORED if packed else zipfile.ZIP_DEFLATED)
+        if hasattr(path, "write"):
+            path.write(buf.getvalue())
+        else:
+            with open(path, "wb") as fh:
+                fh.write(buf.getvalue())
+        return path
+
+
+class _BoundImage(InlineImage):
+    """InlineImage that takes its image part from the compiled template's cache."""
+
+    def __init__(self, compiled, image_descriptor, width=None, height=None, anchor=None):
+        super().__init__(compiled.tpl, image_descriptor, width, height, anchor)
+        self.compiled = compiled
+
+    def _insert_image(self):
+        # InlineImage._insert_image, with StoryPart.new_pic_inline spelled out
+        part = self.tpl.current_rendering_part
+        image_part = self.compiled.image_part(self.image_descriptor)
+        image = image_part.image
+        cx, cy = image.scaled_dimensions(self.width, self.height)
+        inline = CT_Inline.new_pic_inline(part.next_id, part.relate_to(image_part, RT.IMAGE), image.filename, cx, cy)
+        pic = inline.xml
+        if self.anchor:
+            run = parse_xml(pic)
+            if run.xpath(".//a:blip"):
+                pic = self._add_hyperlink(run, self.anchor, part).xml
+        return '</w:t></w:r><w:r><w:drawing>%s</w:drawing></w:r><w:r><w:t xml:space="preserve">' % pic
+
+
+def _insert_before(parent, child, anchor):
+    if anchor is None:
+        parent.append(child)
+    else:
+        anchor.addprevious(child)
+
+
+# ─── Process pool ───────────────────────────────────────────
+_worker_template = None
+
+
+def _init_worker(template_file, autoescape):
+    global _worker_template
+    _worker_template = CompiledTemplate(template_file, autoescape=autoescape)
+
+
+def _render_job(job):
+    context, path = job
+    return _worker_template.save(context, path)
+
+
+def render_batch(template_file, jobs, max_workers=RENDER_WORKERS, autoescape=False):
+    """
+    Render (context, output path) pairs from one template and yield the paths
+    in order. `jobs` is consumed a window at a time, so it can be a long
+    generator (rows from a file, say).
+    """
+    if max_workers <= 1:
+        template = CompiledTemplate(template_file, autoescape=autoescape)
+        for context, path in jobs:
+            yield template.save(context, path)
+        return
+
+    window = max_workers * 8
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(template_file, autoescape)) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(_render_job, job))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a docxtpl template once per JSON-lines context")
+    parser.add_argument("template")
+    parser.add_argument("contexts", help="file with one JSON object per line")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("--name", default="{stem}_{index}.docx",
+                        help="output file name; may use {stem}, {index} and the context's keys")
+    parser.add_argument("--workers", type=int, default=RENDER_WORKERS)
+    parser.add_argument("--autoescape", action="store_true")
+    args = parser.parse_args()
+
+    stem = os.path.splitext(os.path.basename(args.template))[0]
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    def jobs():
+        with open(args.contexts, encoding="utf-8") as fh:
+            for index, line in enumerate(l for l in fh if l.strip()):
+                context = json.loads(line)
+                yield context, os.path.join(args.output_dir, args.name.format_map({**context, "stem": stem, "index": index}))
+
+    count = sum(1 for _ in render_batch(args.template, jobs(), args.workers, args.autoescape))
+    print(f"✅ {count} documents written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Fast HTML-to-text for HighBond rich-text fields.
+
+Gives the same text as BeautifulSoup(value, "html.parser").get_text(...) - the
+same html.parser tokenizer, entity table and whitespace rules - but collects
+the strings straight from the parser events instead of building a tree.
+Strings without markup skip the parser entirely, and results are memoized by
+content, since the same description/recommendation HTML is converted several
+times per report.
+
+    html_to_text(value)                          # get_text(separator="\\n").strip()
+    html_to_text(value, separator="", br="\\n")   # <br> as a newline, like clean_html
+    text, tables = html_text_and_tables(value)   # see clean_html_and_extract_tables
+
+"""
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from bs4.dammit import EntitySubstitution, UnicodeDammit
+
+CACHE_SIZE = 8192
+
+# html.parser tree-builder rules that change what get_text() sees
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem",
+    "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame",
+    "image", "isindex", "nextid", "spacer",
+})
+PRESERVE_WHITESPACE_TAGS = frozenset({"pre", "textarea"})
+HIDDEN_STRING_TAGS = frozenset({"script", "style", "template", "rt", "rp"})  # not part of get_text()
+
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_DECIMAL_REF = re.compile("^([0-9]+)(.*)")
+_HEX_REF = re.compile("^([0-9a-f]+)(.*)")
+_NEWLINES_RE = re.compile(r"\n+")
+
+
+class _TextCollector(HTMLParser):
+    """Collects the strings get_text() would join, in document order."""
+
+    def __init__(self, br=None, p_break=False, tables=False):
+        super().__init__(convert_charrefs=False)
+        self.br = br
+        self.p_break = p_break
+        self.collect_tables = tables
+        self.strings = []
+        self.tables = []
+        self._data = []
+        self._stack = []
+        self._counts = {}
+        self._closed_void = []
+        self._open_tables = []
+        self._open_rows = []
+        self._open_cells = []
+
+    # ── string handling ──
+    def _inside(self, names):
+        return any(self._counts.get(name) for name in names)
+
+    def _emit(self, text):
+        if self._open_tables:
+            for _, cell in self._open_cells:
+                cell.append(text)
+        else:
+            self.strings.append(text)
+
+    def _flush(self, cdata=False):
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        if not self._inside(PRESERVE_WHITESPACE_TAGS) and not text.strip(_ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        # CDATA keeps its own string type, so it shows even inside script/template
+        if cdata or not self._inside(HIDDEN_STRING_TAGS):
+            self._emit(text)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self._data.append(character if character is not None else f"&{name}")
+
+    def handle_charref(self, name):
+        base, pattern = (16, _HEX_REF) if name[:1] in ("x", "X") else (10, _DECIMAL_REF)
+        digits = name[1:] if base == 16 else name
+        extra = ""
+        try:
+            number = int(digits, base)
+        except ValueError:
+            match = pattern.search(digits)
+            if match is None:
+                self._data.append(digits)
+                return
+            number, extra = int(match.group(1), base), match.group(2)
+        self._data.append(UnicodeDammit.numeric_character_reference(number)[0])
+        if extra:
+            self._data.append(extra)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._data.append(data[len("CDATA["):])
+            self._flush(cdata=True)
+
+    # ── tags ──
+    def handle_starttag(self, tag, attrs, void=None):
+        self._flush()
+        self._stack.append(tag)
+        self._counts[tag] = self._counts.get(tag, 0) + 1
+        if self.collect_tables:
+            if tag == "table":
+                # the outer table is decomposed first, so a nested one comes out empty
+                table = {"headers": [], "rows": [], "nested": bool(self._open_tables)}
+                self.tables.append(table)
+                self._open_tables.append(table)
+            elif tag == "tr" and self._open_tables:
+                row = []
+                for table in self._open_tables:
+                    table["rows"].append(row)
+                self._open_rows.append(row)
+            elif tag in ("th", "td") and self._open_tables:
+                # the cell takes its place now, so nested cells come after it (document order)
+                cell = []
+                for owner in ([t["headers"] for t in self._open_tables] if tag == "th" else self._open_rows):
+                    owner.append(cell)
+                self._open_cells.append((tag, cell))
+        if void is None and tag in VOID_TAGS:
+            self._pop_to(tag)
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, void=False)
+        self._flush()
+        self._pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def _pop_to(self, tag):
+        if not self._counts.get(tag):
+            return
+        while self._stack:
+            name = self._stack.pop()
+            self._counts[name] -= 1
+            self._closed(name)
+            if name == tag:
+                break
+
+    def _closed(self, tag):
+        if tag == "br" and self.br is not None:
+            self._emit(self.br)
+        elif tag == "p" and self.p_break:
+            self._emit("\n")
+        elif self.collect_tables and self._open_tables:
+            if tag in ("th", "td") and self._open_cells and self._open_cells[-1][0] == tag:
+                self._open_cells.pop()
+            elif tag == "tr" and self._open_rows:
+                self._open_rows.pop()
+            elif tag == "table":
+                self._open_tables.pop()
+
+    def close(self):
+        super().close()
+        self._flush()
+        while self._stack:
+            self._pop_to(self._stack[-1])
+
+
+def _plain(value):
+    """The single string get_text() sees for markup-free `value` (None if it has markup)."""
+    if "<" in value or "&" in value:
+        return None
+    if value and not value.strip(_ASCII_SPACES):
+        return "\n" if "\n" in value else " "
+    return value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _strings(value, br, p_break=False):
+    plain = _plain(value)
+    if plain is not None:
+        return (plain,) if plain else ()
+    parser = _TextCollector(br=br, p_break=p_break)
+    parser.feed(value)
+    parser.close()
+    return tuple(parser.strings)
+
+
+def html_to_text(value, separator="\n", strip=True, br=None, p_break=False):
+    """
+    BeautifulSoup(value, "html.parser").get_text(separator) without the tree.
+    `br` replaces each <br> with that string first, as `br.replace_with(br)` does;
+    `p_break` adds a newline at the end of each <p>. None gives "".
+    """
+    if value is None:
+        return ""
+    text = separator.join(_strings(str(value), br, p_break))
+    return text.strip() if strip else text
+
+
+def _cell_text(strings):
+    return "".join(s.strip() for s in strings)  # get_text(strip=True)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _text_and_tables(value):
+    plain = _plain(value)
+    if plain is not None:
+        strings, tables = [plain], ()
+    else:
+        parser = _TextCollector(br="\n", p_break=True, tables=True)
+        parser.feed(value)
+        parser.close()
+        strings = parser.strings
+        tables = tuple(
+            ((), ()) if table["nested"] else (tuple(map(_cell_text, table["headers"])), tuple(
+                row for row in (tuple(map(_cell_text, cells)) for cells in table["rows"]) if any(row)
+            ))
+            for table in parser.tables
+        )
+    text = "\n".join(strings).strip().replace("$", "")
+    return _NEWLINES_RE.sub("\n", text), tables
+
+
+def html_text_and_tables(value):
+    """
+    Text and tables of a rich-text field, as clean_html_and_extract_tables
+    computes them: script/style dropped, <br> and the end of each <p> become
+    newlines, tables are pulled out as (headers, non-empty rows) and removed
+    from the text, "$" is dropped and runs of newlines collapse. The text is
+    "" (not "N/A") when nothing is left.
+    """
+    text, tables = _text_and_tables(value)
+    return text, [(list(headers), [list(row) for row in rows]) for headers, rows in tables]
@@ -0,0 +1,146 @@
+"""
+Pre-scaled, content-addressed image cache for the report scripts.
+
+Logos, banners and charts are usually far larger than the space they take on
+the page (a 300 dpi chart shown at 5.7in, a logo shown at 1.4in), and every
+generated document embedded them at full resolution. scaled_image() returns
+the path of a cached copy downscaled to the display size at MEDIA_DPI and
+re-encoded (PNG optimized, JPEG at MEDIA_JPEG_QUALITY). The copy is keyed by
+the SHA-256 of the source bytes and the target size, so each distinct source
+is processed once across runs. Documents that embed the same asset get
+byte-identical media, which python-docx (and hb_docxtpl) store as one part.
+
+    run.add_picture(scaled_image("logo.png", width=Inches(1.4)), width=Inches(1.4))
+    InlineImage(tpl, scaled_image(chart_png_bytes))      # native size, capped at MEDIA_DPI
+
+With no width or height the image keeps its native display size (pixels / its
+own dpi). The cached copy is never larger than the source: when re-encoding
+does not help, the source bytes are stored as they are. Formats other than PNG
+and JPEG, or a missing Pillow, give back the source path unchanged.
+
+Settings: HIGHBOND_MEDIA_CACHE (directory), HIGHBOND_MEDIA_DPI (default 220,
+Word's own print compression target), HIGHBOND_MEDIA_JPEG_QUALITY (default 85).
+"""
+import hashlib
+import io
+import os
+import tempfile
+
+from docx.image.image import Image as DocxImage
+from docx.shared import Emu
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+MEDIA_CACHE_DIR = os.getenv("HIGHBOND_MEDIA_CACHE", os.path.join(".hb_cache", "media"))
+MEDIA_DPI = int(os.getenv("HIGHBOND_MEDIA_DPI", "220"))
+MEDIA_JPEG_QUALITY = int(os.getenv("HIGHBOND_MEDIA_JPEG_QUALITY", "85"))
+
+# a PNG with at most this many colours is line art, not a photo
+_FLAT_COLOURS = 4096
+_FORMATS = {"image/png": ("PNG", ".png"), "image/jpeg": ("JPEG", ".jpg")}
+
+# (path, mtime, size) -> sha256 of the file, so an unchanged file is hashed once per process
+_file_digests = {}
+# (file key, width, height, dpi, quality, cache dir) -> cached path
+_assets = {}
+
+
+def _source(image):
+    """(bytes, sha256, path or None) for a path, bytes or binary stream."""
+    if isinstance(image, (bytes, bytearray)):
+        data = bytes(image)
+        return data, hashlib.sha256(data).hexdigest(), None
+    if hasattr(image, "read"):
+        image.seek(0)
+        data = image.read()
+        return data, hashlib.sha256(data).hexdigest(), None
+    path = os.fspath(image)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    key = _file_key(path)
+    if key not in _file_digests:
+        _file_digests[key] = hashlib.sha256(data).hexdigest()
+    return data, _file_digests[key], path
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def scaled_image(image, width=None, height=None, dpi=MEDIA_DPI, quality=MEDIA_JPEG_QUALITY, cache_dir=MEDIA_CACHE_DIR):
+    """
+    Path of the cached copy of `image` (a path, bytes or binary stream) for
+    display at `width` x `height` (python-docx Lengths; either or both may be
+    None, as with add_picture).
+    """
+    key = None
+    if not isinstance(image, (bytes, bytearray)) and not hasattr(image, "read"):
+        key = (_file_key(image), width, height, dpi, quality, cache_dir)
+        if key in _assets and os.path.exists(_assets[key]):
+            return _assets[key]
+
+    data, digest, path = _source(image)
+    info = DocxImage.from_blob(data)
+    if Image is None or info.content_type not in _FORMATS:
+        return path if path is not None else _store(data, digest, "", cache_dir, os.path.splitext(info.filename)[1])
+
+    pil_format, ext = _FORMATS[info.content_type]
+    cx, cy = info.scaled_dimensions(width, height)
+    px = (max(1, round(Emu(cx).inches * dpi)), max(1, round(Emu(cy).inches * dpi)))
+    if px[0] >= info.px_width or px[1] >= info.px_height:
+        px = None  # already at or below the target resolution: re-encode only
+    params = f"{px[0]}x{px[1]}-{dpi}dpi" if px else "native"
+    if pil_format == "JPEG":
+        params += f"-q{quality}"
+
+    target = os.path.join(cache_dir, digest[:2], f"{digest}-{params}{ext}")
+    if not os.path.exists(target):
+        _store(_encode(data, pil_format, px, dpi, quality), digest, params, cache_dir, ext)
+    if key is not None:
+        _assets[key] = target
+    return target
+
+
+def _encode(data, pil_format, px, dpi, quality):
+    """`data` resized to `px` (None: as is) and re-encoded; the source if that is no bigger."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        options = {"optimize": True}
+        if px and img.mode in ("1", "P"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        if px:
+            # charts and logos (few colours) go back to a palette after the resize
+            flat = pil_format == "PNG" and img.getcolors(_FLAT_COLOURS) is not None
+            img = img.resize(px, Image.LANCZOS)
+            if flat:
+                img = img.quantize(256)
+            # native display size stays what it was: pixels / dpi
+            options["dpi"] = (dpi, dpi)
+        elif "dpi" in img.info:
+            options["dpi"] = img.info["dpi"]
+        if pil_format == "JPEG":
+            options["quality"] = quality
+            if img.mode not in ("RGB", "L", "CMYK"):
+                img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, pil_format, **options)
+    encoded = buf.getvalue()
+    return encoded if len(encoded) < len(data) else data
+
+
+def _store(data, digest, params, cache_dir, ext):
+    folder = os.path.join(cache_dir, digest[:2])
+    target = os.path.join(folder, f"{digest}-{params}{ext}" if params else f"{digest}{ext}")
+    if os.path.exists(target):
+        return target
+    os.makedirs(folder, exist_ok=True)
+    # several report processes may fill the cache at once: write aside, then rename
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=ext)
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, target)
+    return target
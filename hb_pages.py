@@ -0,0 +1,43 @@
+"""
+Streaming iteration over paginated HighBond JSON:API collections.
+
+Records are yielded as each page arrives, so callers can process planning
+files, results files, objectives, risks, controls, ... without first building
+one big list (and without the O(n²) `all_data = all_data + page` copy).
+
+    for project in iter_records(session, f"{BASE_URL}/projects", headers=headers):
+        ...
+
+Failures are raised (requests.HTTPError / RequestException) rather than
+swallowed, so a bad page never falls through to an undefined or stale
+response.
+"""
+from urllib.parse import urljoin
+
+
+def iter_pages(session, url, params=None, headers=None, base_url=None, timeout=10):
+    """
+    Yield each page payload of `url`, parsed once, following links.next.
+    `params` only apply to the first request; next links already carry them.
+    Relative next links are resolved against `base_url` (default: `url`).
+    """
+    base_url = base_url or url
+    while url:
+        resp = session.get(url, headers=headers, params=params, timeout=timeout)
+        resp.raise_for_status()
+        payload = resp.json()
+        yield payload
+        # a single-resource document (data is a dict) has no further pages
+        next_link = (payload.get("links") or {}).get("next") if isinstance(payload.get("data"), list) else None
+        url = urljoin(base_url, next_link) if next_link else None
+        params = None
+
+
+def iter_records(session, url, params=None, headers=None, base_url=None, timeout=10):
+    """Yield resource objects one at a time across every page of `url`."""
+    for payload in iter_pages(session, url, params=params, headers=headers, base_url=base_url, timeout=timeout):
+        data = payload.get("data")
+        if isinstance(data, list):
+            yield from data
+        elif isinstance(data, dict):
+            yield data
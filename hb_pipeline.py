@@ -0,0 +1,136 @@
+"""
+Small dependency-graph scheduler for staged fetches.
+
+Each stage starts as soon as its inputs are known instead of waiting for
+every earlier stage:
+
+    pipe = StagePipeline(combine=concat_frames)
+    pipe.stage("controls", fetch_controls)
+    pipe.stage("issues", fetch_issues)
+    pipe.stage("mitigations", fetch_mitigations, each="controls")
+    results, timings = pipe.run()
+
+`after=(...)` stages are called once with the combined results of their
+inputs. `each="x"` stages are called once per part of stage "x" as the part
+arrives, so a downstream fetch can start on the first IDs while the rest of
+the upstream stage is still in flight. A stage function that returns a
+generator emits one part per yielded value. Parts are combined in upstream
+order (not completion order), so results don't depend on timing.
+"""
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _default_combine(parts):
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else parts
+
+
+class _Stage:
+    def __init__(self, name, fn, after, each):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.each = each
+        self.parts = []  # (key, value)
+        self.pending = 0
+        self.started = None
+        self.finished = None
+        self.calls = 0
+        self.submitted = False
+
+
+class StagePipeline:
+    """Run named stages on a thread pool in dependency order; see module docstring."""
+
+    def __init__(self, max_workers=8, combine=_default_combine):
+        self.max_workers = max_workers
+        self.combine = combine
+        self._stages = {}
+
+    def stage(self, name, fn, after=(), each=None):
+        if each is not None and after:
+            raise ValueError(f"stage {name!r}: use either `after` or `each`, not both")
+        for dep in (*after, *([each] if each else [])):
+            if dep not in self._stages:
+                raise ValueError(f"stage {name!r} depends on unknown stage {dep!r}")
+        self._stages[name] = _Stage(name, fn, after, each)
+        return self
+
+    def run(self):
+        """Run every stage. Returns ({name: combined result}, {name: timing dict})."""
+        events = queue.Queue()
+        results = {}
+        origin = time.perf_counter()
+
+        def _work(stage, key, args):
+            now = time.perf_counter()
+            events.put(("start", stage.name, now, None))
+            try:
+                out = stage.fn(*args)
+                if hasattr(out, "__next__"):
+                    for index, part in enumerate(out):
+                        events.put(("part", stage.name, key + (index,), part))
+                else:
+                    events.put(("part", stage.name, key + (0,), out))
+            except BaseException as exc:  # handed to run() and re-raised there
+                events.put(("error", stage.name, key, exc))
+                return
+            events.put(("end", stage.name, key, None))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+
+            def _submit(stage, key, args):
+                stage.pending += 1
+                stage.calls += 1
+                pool.submit(_work, stage, key, args)
+
+            def _schedule():
+                for stage in self._stages.values():
+                    if stage.submitted or stage.each or not all(dep in results for dep in stage.after):
+                        continue
+                    stage.submitted = True
+                    _submit(stage, (), [results[dep] for dep in stage.after])
+
+            def _finish(stage):
+                stage.finished = time.perf_counter()
+                parts = [value for _, value in sorted(stage.parts, key=lambda item: item[0])]
+                results[stage.name] = self.combine(parts)
+                for child in self._stages.values():
+                    if child.each == stage.name and not child.pending and child.name not in results:
+                        _finish(child)
+
+            _schedule()
+            while len(results) < len(self._stages):
+                kind, name, key, value = events.get()
+                stage = self._stages[name]
+                if kind == "error":
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise value
+                if kind == "start":
+                    stage.started = key if stage.started is None else min(stage.started, key)
+                elif kind == "part":
+                    stage.parts.append((key, value))
+                    for child in self._stages.values():
+                        if child.each == name:
+                            _submit(child, key, [value])
+                elif kind == "end":
+                    stage.pending -= 1
+                    source_done = stage.each is None or stage.each in results
+                    if not stage.pending and source_done:
+                        _finish(stage)
+                    _schedule()
+
+        timings = {}
+        for stage in self._stages.values():
+            started = stage.started if stage.started is not None else stage.finished
+            timings[stage.name] = {
+                "started": round(started - origin, 3),
+                "finished": round(stage.finished - origin, 3),
+                "seconds": round(stage.finished - started, 3),
+                "calls": stage.calls,
+                "parts": len(stage.parts),
+            }
+        return results, timings
@@ -0,0 +1,289 @@
+"""
+Adaptive rate limiting for the HighBond API.
+
+A token bucket caps requests per second and a concurrency window caps requests
+in flight. Both are steered by AIMD (additive increase, multiplicative
+decrease): every healthy response nudges them up, while a 429/503 or a latency
+spike above the target halves them. A Retry-After header pauses *all* callers
+sharing the limiter, rather than each thread sleeping blindly on its own.
+
+    session.mount("https://", LimitedAdapter(limiter=shared_limiter(), max_retries=retries))
+
+hb_cache.CachingAdapter builds on LimitedAdapter, so cache hits never spend
+tokens. AsyncAdaptiveLimiter is the asyncio view of an AdaptiveLimiter (the
+process-wide one by default) used by hb_async. Event loops in any thread and
+plain threads draw from the same bucket and window, and see the same pauses.
+"""
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+
+from requests.adapters import HTTPAdapter
+
+DEFAULT_RATE = float(os.getenv("HIGHBOND_RATE", "10"))  # requests/second to start from
+MAX_RATE = float(os.getenv("HIGHBOND_MAX_RATE", "50"))
+DEFAULT_CONCURRENCY = int(os.getenv("HIGHBOND_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.getenv("HIGHBOND_MAX_CONCURRENCY", "16"))
+LATENCY_TARGET = float(os.getenv("HIGHBOND_LATENCY_TARGET", "2.0"))  # seconds
+
+THROTTLE_STATUSES = {429, 503}
+
+
+def retry_after_seconds(value, default):
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class AIMDController:
+    """Rate and concurrency targets, adjusted from response outcomes. Updates are thread-safe."""
+
+    def __init__(
+        self,
+        rate=DEFAULT_RATE,
+        concurrency=DEFAULT_CONCURRENCY,
+        min_rate=0.5,
+        max_rate=MAX_RATE,
+        min_concurrency=1,
+        max_concurrency=MAX_CONCURRENCY,
+        latency_target=LATENCY_TARGET,
+        rate_step=0.1,
+        cooldown=1.0,
+    ):
+        self.rate = float(rate)
+        self.limit = float(concurrency)
+        self.min_rate, self.max_rate = min_rate, max_rate
+        self.min_concurrency, self.max_concurrency = min_concurrency, max_concurrency
+        self.latency_target = latency_target
+        self.rate_step = rate_step
+        self.cooldown = cooldown
+        self.latency = None  # EWMA of response times
+        self.throttled = 0
+        self.succeeded = 0
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def concurrency(self):
+        return max(self.min_concurrency, int(self.limit))
+
+    def on_success(self, latency, now):
+        with self._lock:
+            self._on_success(latency, now)
+
+    def on_throttle(self, now):
+        with self._lock:
+            self.throttled += 1
+            self._decrease(now, 0.5)
+
+    def _on_success(self, latency, now):
+        self.succeeded += 1
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if self.latency > self.latency_target:
+            # the API is slowing down before it starts refusing: ease off gently
+            self._decrease(now, 0.9)
+            return
+        self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+        self.rate = min(self.max_rate, self.rate + self.rate_step)
+
+    def _decrease(self, now, factor):
+        # one cut per cooldown window, so a burst of 429s from requests that
+        # were already in flight doesn't collapse the limits to the floor
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit * factor)
+        self.rate = max(self.min_rate, self.rate * factor)
+
+
+class Outcome:
+    """Filled in by the caller inside a limiter slot so the limiter can learn from it."""
+
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+
+    def observe(self, status, headers=None):
+        self.status = status
+        if status in THROTTLE_STATUSES:
+            self.retry_after = (headers or {}).get("Retry-After")
+
+
+class _LimiterState:
+    """Token bucket + in-flight window; AdaptiveLimiter guards it with its lock."""
+
+    def __init__(self, controller=None):
+        self.ctl = controller or AIMDController()
+        self.in_flight = 0
+        self._tokens = 1.0
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._throttle_streak = 0
+
+    def _try_take(self, now):
+        """Take a slot and a token, or return how long to wait (None = until a slot frees up)."""
+        self._tokens = min(max(1.0, self.ctl.rate), self._tokens + (now - self._refilled) * self.ctl.rate)
+        self._refilled = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= self.ctl.concurrency:
+            return None
+        if self._tokens < 1.0:
+            return (1.0 - self._tokens) / self.ctl.rate
+        self._tokens -= 1.0
+        self.in_flight += 1
+        return 0.0
+
+    def _settle(self, outcome, started, now):
+        self.in_flight -= 1
+        if outcome.status in THROTTLE_STATUSES:
+            self.ctl.on_throttle(now)
+            self._throttle_streak += 1
+            pause = retry_after_seconds(outcome.retry_after, min(2 ** self._throttle_streak, 60))
+            self._paused_until = max(self._paused_until, now + pause)
+        elif outcome.status is not None and outcome.status < 500:
+            self._throttle_streak = 0
+            self.ctl.on_success(now - started, now)
+
+
+class AdaptiveLimiter(_LimiterState):
+    """
+    Thread-safe limiter; wrap each request in `with limiter.slot() as outcome:`.
+    asyncio code shares it through AsyncAdaptiveLimiter.
+    """
+
+    def __init__(self, controller=None):
+        super().__init__(controller)
+        self._cond = threading.Condition()
+        self._async_waiters = set()  # (loop, future) of AsyncAdaptiveLimiter.acquire calls
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self._try_take(time.monotonic())
+                if wait == 0.0:
+                    return time.monotonic()
+                self._cond.wait(wait)
+
+    def release(self, outcome, started):
+        with self._cond:
+            self._settle(outcome, started, time.monotonic())
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _take_or_register(self, loop, future):
+        """Take a slot (0.0), or register `future` to be woken on the next release and return the wait."""
+        with self._cond:
+            wait = self._try_take(time.monotonic())
+            if wait != 0.0:
+                self._async_waiters.add((loop, future))
+            return wait
+
+    def _unregister(self, loop, future):
+        with self._cond:
+            self._async_waiters.discard((loop, future))
+
+    @contextmanager
+    def slot(self):
+        started = self.acquire()
+        outcome = Outcome()
+        try:
+            yield outcome
+        finally:
+            self.release(outcome, started)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AsyncAdaptiveLimiter:
+    """
+    asyncio view of an AdaptiveLimiter (the process-wide one by default); wrap
+    each request in `async with limiter.slot() as outcome:`. Waiting never
+    blocks the event loop: a waiter sleeps until its computed wait is over or
+    a release anywhere in the process wakes it.
+    """
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter or shared_limiter()
+
+    @property
+    def ctl(self):
+        return self.limiter.ctl
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+            wait = self.limiter._take_or_register(loop, future)
+            if wait == 0.0:
+                return time.monotonic()
+            try:
+                await asyncio.wait_for(future, wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.limiter._unregister(loop, future)
+
+    async def release(self, outcome, started):
+        self.limiter.release(outcome, started)
+
+    @asynccontextmanager
+    async def slot(self):
+        started = await self.acquire()
+        outcome = Outcome()
+        try:
+            yield outcome
+        finally:
+            await self.release(outcome, started)
+
+
+class LimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose sends go through an AdaptiveLimiter. Throttled (429/503)
+    responses are re-sent once the shared pause is over; after
+    `max_throttle_retries` the last response is returned to the caller as-is.
+    """
+
+    def __init__(self, limiter=None, max_throttle_retries=5, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter or shared_limiter()
+        self.max_throttle_retries = max_throttle_retries
+
+    def send(self, request, **kwargs):
+        for attempt in range(self.max_throttle_retries + 1):
+            with self.limiter.slot() as outcome:
+                resp = super().send(request, **kwargs)
+                outcome.observe(resp.status_code, resp.headers)
+            if resp.status_code not in THROTTLE_STATUSES or attempt == self.max_throttle_retries:
+                return resp
+            resp.close()
+        return resp
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter():
+    """Process-wide AdaptiveLimiter so every script helper draws from one budget."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AdaptiveLimiter()
+        return _shared
@@ -0,0 +1,129 @@
+"""
+Incremental sync of HighBond collections using `updated_at` watermarks.
+
+Each synced resource keeps a JSON snapshot under HIGHBOND_SYNC_DIR holding
+its records (keyed by id) and the highest `updated_at` seen. Later runs only
+ask the API for records with `updated_at >= watermark` and merge them in.
+
+Resources fetched one id at a time (sync_by_id) re-query the ids they already
+hold with the same `updated_at` filter, batched through `filter[id]`.
+
+The API can't report deletions, so a full re-crawl is forced whenever the last
+full sync is older than HIGHBOND_SYNC_FULL_DAYS (default 7) or `full=True`.
+
+    store = SnapshotStore()
+    records = sync_collection(store, "controls", lambda params: fetch(url, params))
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+SYNC_DIR = os.getenv("HIGHBOND_SYNC_DIR", ".hb_sync")
+FULL_SYNC_DAYS = float(os.getenv("HIGHBOND_SYNC_FULL_DAYS", "7"))
+
+_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def updated_at(record):
+    """`attributes.updated_at` of a JSON:API resource object, or ''."""
+    return (record.get("attributes") or {}).get("updated_at") or ""
+
+
+def incremental_params(watermark):
+    """Query params asking only for records changed since `watermark`."""
+    return {"filter[updated_at][gte]": watermark} if watermark else {}
+
+
+class SnapshotStore:
+    """Directory of per-resource JSON snapshots: {watermark, synced_at, full_synced_at, records}."""
+
+    def __init__(self, root=SYNC_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.root, _NAME_RE.sub("_", name) + ".json")
+
+    def load(self, name):
+        try:
+            with open(self._path(name), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"watermark": "", "synced_at": 0, "full_synced_at": 0, "records": {}}
+
+    def save(self, name, snapshot):
+        # write-then-rename so an interrupted run never leaves a torn snapshot
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(snapshot, fh)
+        with self._lock:
+            os.replace(tmp, self._path(name))
+
+    def needs_full_sync(self, snapshot):
+        return not snapshot["full_synced_at"] or time.time() - snapshot["full_synced_at"] > FULL_SYNC_DAYS * 86400
+
+
+def merge_records(snapshot, records):
+    """Upsert `records` into the snapshot by id and advance its watermark. Returns the count merged."""
+    count = 0
+    watermark = snapshot["watermark"]
+    for rec in records:
+        rid = rec.get("id")
+        if rid is None:
+            continue
+        snapshot["records"][str(rid)] = rec
+        watermark = max(watermark, updated_at(rec))
+        count += 1
+    snapshot["watermark"] = watermark
+    return count
+
+
+def sync_collection(store, name, fetch, full=False):
+    """
+    Refresh snapshot `name` and return all of its records.
+    `fetch(params)` must return the records for a collection query with the
+    extra `params` applied (an empty dict means "everything").
+    """
+    snapshot = store.load(name)
+    full = full or store.needs_full_sync(snapshot)
+    if full:
+        fresh = {"watermark": "", "synced_at": 0, "full_synced_at": 0, "records": {}}
+        merge_records(fresh, fetch({}))
+        fresh["full_synced_at"] = time.time()
+        snapshot = fresh
+    else:
+        merge_records(snapshot, fetch(incremental_params(snapshot["watermark"])))
+    snapshot["synced_at"] = time.time()
+    store.save(name, snapshot)
+    return list(snapshot["records"].values())
+
+
+def sync_by_id(store, name, ids, fetch_many, full=False, fetch_changed=None):
+    """
+    Snapshot of individually-fetched resources (e.g. /risks/{id}).
+    `fetch_many(ids)` gets the list of ids to download and returns their records.
+    Ids missing from the snapshot are fetched unless a full sync is due.
+    `fetch_changed(ids, params)` re-queries ids the snapshot already holds, with
+    incremental_params() of its watermark, and returns those changed since.
+    Without it, edits to known ids only show up after the next full sync.
+    Returns one record per distinct id, in order, skipping any that could not be fetched.
+    """
+    ids = list(dict.fromkeys(str(i) for i in ids))
+    snapshot = store.load(name)
+    full = full or store.needs_full_sync(snapshot)
+    if full:
+        snapshot = {"watermark": "", "synced_at": 0, "full_synced_at": time.time(), "records": {}}
+    known = [i for i in ids if i in snapshot["records"]]
+    missing = [i for i in ids if i not in snapshot["records"]]
+    # ask with the watermark as loaded: records merged below may move it past older edits
+    changed = fetch_changed(known, incremental_params(snapshot["watermark"])) if known and fetch_changed else []
+    if missing:
+        merge_records(snapshot, fetch_many(missing))
+    merge_records(snapshot, (rec for rec in changed if str(rec.get("id")) in snapshot["records"]))
+    snapshot["synced_at"] = time.time()
+    store.save(name, snapshot)
+    return [snapshot["records"][i] for i in ids if i in snapshot["records"]]
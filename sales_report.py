@@ -1,47 +1,73 @@
-from docxtpl import DocxTemplate, InlineImage
+"""
+Sales reports from Report_templates/reportTmpl.docx.
+
+    python sales_report.py                                  # one report -> sale_report.docx
+    python sales_report.py --branches Nairobi Mombasa Kisumu -o output/sales
+
+Each report gets random sales data, a table, the top three items and a
+revenue chart. The charts for all branches are drawn first, in parallel
+(hb_charts), and go into the documents as in-memory PNGs.
+"""
+import argparse
+import io
+import os
 from datetime import datetime as dt
 from random import randint
-import matplotlib.pyplot as plt
 
-# import the template
+from hb_charts import CHART_WORKERS, ChartSpec, render_charts
+from hb_docxtpl import BatchImage, CompiledTemplate
+
+TEMPLATE = 'Report_templates/reportTmpl.docx'
+
 
-doc = DocxTemplate('Report_templates/reportTmpl.docx')
+def sales_data():
+    #generate random sales data
+    sales = []
+    for idx, x in enumerate(range(9)):
+        cPU = randint(0,9)+1
+        unit_sold = randint(0,9)+5
+        sale = {'name':f"Item {idx+1}", 'cPu':cPU, 'nUnits':unit_sold, 'revenue': cPU*unit_sold}
+        sales.append(sale)
+    return sales
 
-#generate random sales data
-sales = []
-for idx, x in enumerate(range(9)):
-    cPU = randint(0,9)+1
-    unit_sold = randint(0,9)+5
-    sale = {'name':f"Item {idx+1}", 'cPu':cPU, 'nUnits':unit_sold, 'revenue': cPU*unit_sold}
-    sales.append(sale)
 
-# get top 3 performing products
+def revenue_chart(sales, branch=None):
+    # plot sales revenue: item names against revenues
+    title = "Revenue per Item" if branch is None else f"Revenue per Item — {branch}"
+    return ChartSpec("bar", [d["name"] for d in sales], [d["revenue"] for d in sales],
+                     title=title, xlabel="Item", ylabel="Revenue")
 
-top3 =[item['name'] for item in sorted(sales, key=lambda x: x['revenue'], reverse=True)[:3] ]
-print(top3)
 
-# plot sales revenue
+def report_context(sales, chart_png):
+    # get top 3 performing products
+    top3 = [item['name'] for item in sorted(sales, key=lambda x: x['revenue'], reverse=True)[:3]]
+    return {
+        'reportDtStr': dt.strftime(dt.today(), '%Y-%m-%d'),
+        'salesTblRows': sales,
+        'topItemsRows': top3,
+        'trendImg': BatchImage(io.BytesIO(chart_png)),
+    }
 
-# Extract item names and revenues
-items = [d["name"] for d in sales]
-revenues = [d["revenue"] for d in sales]
 
-# Plot bar chart
-plt.bar(items, revenues)
+def main():
+    parser = argparse.ArgumentParser(description="Render reportTmpl.docx with a revenue chart, per branch")
+    parser.add_argument("--branches", nargs="*", default=[], help="one report per branch (default: a single report)")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("--workers", type=int, default=CHART_WORKERS, help="chart rendering processes")
+    args = parser.parse_args()
 
-# Add labels and title
-plt.xlabel("Item")
-plt.ylabel("Revenue")
-plt.title("Revenue per Item")
+    branches = args.branches or [None]
+    sales = [sales_data() for _ in branches]
+    charts = render_charts([revenue_chart(rows, branch) for rows, branch in zip(sales, branches)], args.workers)
 
-plt.savefig('images/sales_visuals.png', dpi=300, bbox_inches='tight')
+    template = CompiledTemplate(TEMPLATE)
+    if args.branches:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for branch, rows, png in zip(branches, sales, charts):
+        path = 'sale_report.docx' if branch is None else os.path.join(args.output_dir, f"sale_report_{branch}.docx")
+        template.save(report_context(rows, png), path)
+        print(f"✅ {path}")
 
-context = {
-        'reportDtStr' : dt.strftime(dt.today(),'%Y-%m-%d'),
-        'salesTblRows' : sales,
-        'topItemsRows' : top3,
-        'trendImg' : InlineImage(doc, 'images/sales_visuals.png')
-}
 
-doc.render(context)
-doc.save('sale_report.docx')
+if __name__ == "__main__":
+    main()
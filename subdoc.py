@@ -1,6 +1,7 @@
 from docxtpl import DocxTemplate, Subdoc
 from docx.shared import Inches
 from docx import Document
+from hb_media import scaled_image
 
 tpl = DocxTemplate("Report_templates/subdoc_tpl.docx")
 
@@ -17,7 +18,7 @@ sd.add_heading("Heading, level 1", level=1)
 sd.add_paragraph("This is an Intense quote", style="IntenseQuote")
 
 sd.add_paragraph("A picture :")
-sd.add_picture("images/python_logo.png", width=Inches(1.25))
+sd.add_picture(scaled_image("images/python_logo.png", width=Inches(1.25)), width=Inches(1.25))
 
 sd.add_paragraph("A Table :")
 table = sd.add_table(rows=1, cols=3)
@@ -1,19 +1,92 @@
-from docxtpl import DocxTemplate, InlineImage
+"""
+Invitations from Report_templates/inviteTmpl.docx.
+
+    python template_report.py                                   # the sample invite -> invite_doc.docx
+    python template_report.py recipients.csv -o output/invites  # one document per row
+    python template_report.py recipients.parquet --combined invites.docx
+
+Each row of the CSV or Parquet file fills the template's fields: todayStr,
+recipientName, evntDtStr, venueStr, senderName, and bannerImg, the path of an
+image. Missing or empty columns fall back to the sample context below. Values
+are plain text (escaped for XML). Rows are streamed and the template is
+compiled once (hb_docxtpl). Each banner goes through the hb_media cache, so it
+is re-encoded, read and hashed once however many invites use it.
+"""
+import argparse
+import csv
+import os
 from datetime import datetime as dt
 
-doc = DocxTemplate("Report_templates/inviteTmpl.docx")
-today = dt.strftime(dt.now(),'%Y-%m-%d') 
+from hb_docxtpl import RENDER_WORKERS, BatchImage, CompiledTemplate, render_batch
+from hb_media import scaled_image
+
+TEMPLATE = "Report_templates/inviteTmpl.docx"
+
+today = dt.strftime(dt.now(), '%Y-%m-%d')
 
 # create context data
 context = {
         'todayStr': today,
         'recipientName': 'John Adah',
         'evntDtStr': '2025-08-30',
-        'venueStr' : 'Eleganza hotel',
-        'senderName' : 'Gabriel',
-        'bannerImg': InlineImage(doc,'images/party_banner_0.png')
+        'venueStr': 'Eleganza hotel',
+        'senderName': 'Gabriel',
+        'bannerImg': 'images/party_banner_0.png',
 }
 
-doc.render(context)
 
-doc.save('invite_doc.docx')
\ No newline at end of file
+def read_rows(path, batch_size=10_000):
+    """Recipient rows from a .csv or .parquet file, as dicts, without loading the whole file."""
+    if path.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            yield from csv.DictReader(fh)
+
+
+def invite_context(row, defaults=context):
+    """The template context for one recipient row."""
+    ctx = dict(defaults)
+    for key, value in row.items():
+        if value is None or value != value or value == "":  # None, NaN, empty CSV cell
+            continue
+        ctx[key] = value
+    ctx['bannerImg'] = BatchImage(scaled_image(ctx['bannerImg']))
+    return ctx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render inviteTmpl.docx once per recipient")
+    parser.add_argument("recipients", nargs="?", help=".csv or .parquet file, one recipient per row")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("--name", default="invite_{index}.docx",
+                        help="output file name; may use {index} and the row's columns")
+    parser.add_argument("--combined", metavar="DOCX", help="write one document, a page per recipient, instead")
+    parser.add_argument("--workers", type=int, default=RENDER_WORKERS)
+    args = parser.parse_args()
+
+    if not args.recipients:
+        CompiledTemplate(TEMPLATE, autoescape=True).save(invite_context({}), 'invite_doc.docx')
+        return
+
+    contexts = (invite_context(row) for row in read_rows(args.recipients))
+    if args.combined:
+        CompiledTemplate(TEMPLATE, autoescape=True).save_merged(contexts, args.combined)
+        print(f"✅ Invites written to {args.combined}")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    def jobs():
+        for index, ctx in enumerate(contexts):
+            yield ctx, os.path.join(args.output_dir, args.name.format_map({**ctx, "index": index}))
+
+    count = sum(1 for _ in render_batch(TEMPLATE, jobs(), args.workers, autoescape=True))
+    print(f"✅ {count} invites written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()